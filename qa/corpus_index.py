@@ -0,0 +1,387 @@
+import argparse
+import hashlib
+import json
+import mmap
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+
+MAGIC = b"TKGIDX2\n"
+_FACT_RE = re.compile(r"\b(E\d+)\s+(R\d+)\s+(E\d+)\s*\[(\d+),(\d+)\]")
+
+
+class _Names:
+    """Read-only sequence of interned names decoded lazily from the mapped file.
+
+    Names are stored in sorted order, so an ID is simply a name's rank and lookups bisect.
+    """
+
+    def __init__(self, offs, blob):
+        self._offs = offs
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offs) - 1
+
+    def __getitem__(self, i):
+        return bytes(self._blob[self._offs[i]:self._offs[i + 1]]).decode("utf-8")
+
+    def id_of(self, name):
+        i = bisect_left(self, name)
+        if i < len(self) and self[i] == name:
+            return i
+        return None
+
+
+class _Seq:
+    """Lazy read-only sequence over rows [lo, hi) decoded one at a time (supports bisect)."""
+
+    def __init__(self, decode, lo, hi):
+        self._decode = decode
+        self._lo = lo
+        self._hi = hi
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def __getitem__(self, i):
+        n = self._hi - self._lo
+        if isinstance(i, slice):
+            return [self._decode(self._lo + j) for j in range(*i.indices(n))]
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self._decode(self._lo + i)
+
+    def __iter__(self):
+        for j in range(self._lo, self._hi):
+            yield self._decode(j)
+
+
+class _View:
+    """dict-like `.get()` view over one grouping of the corpus index."""
+
+    def __init__(self, lookup):
+        self._lookup = lookup
+
+    def get(self, key, default=None):
+        ret = self._lookup(key)
+        return default if ret is None else ret
+
+    def __getitem__(self, key):
+        ret = self._lookup(key)
+        if ret is None:
+            raise KeyError(key)
+        return ret
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+
+class CorpusIndex:
+    """
+    Corpus-level TKG index opened read-only via mmap.
+    Exposes the same lookups as PerContextIndex (by_rel_tail, by_hrt, by_head,
+    by_tail, by_head_rel, rel_tail_starts, rel_tail_by_end, rel_tail_ends,
+    rel_tail_max_dur, rel_tail_from), so TKGBackend and qa.rules can use it in place of
+    prompt text. Nothing is decoded at open time; (rel, tail) buckets are returned as lazy
+    sequences, so bisecting them touches only O(log n) rows. Pages are shared between
+    processes mapping the same file.
+
+    File layout: MAGIC, u32 header length, JSON header, then 8-byte aligned sections:
+      - ent_offs/ent_blob, rel_offs/rel_blob: sorted interned names
+      - head, rel, tail (int32), start, end (int64): facts sorted by (rel, tail, start, duration, head)
+      - perm_h: row ids sorted by (head, rel, tail, start, duration)
+      - perm_t: row ids sorted by (tail, rel, head, start, duration)
+      - perm_rt_end: row ids sorted by (rel, tail, end, duration, head); same group ranges as rt
+      - rt_maxdur: longest duration per (rel, tail) group
+      - <group>_keys/<group>_offs: sorted composite keys and row ranges for rt, h, hr, hrt, t
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"not a corpus index: {self.path}")
+        hlen = int.from_bytes(buf[len(MAGIC):len(MAGIC) + 4], "little")
+        header = json.loads(bytes(buf[len(MAGIC) + 4:len(MAGIC) + 4 + hlen]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"corpus index {self.path} was built on a {header['byteorder']}-endian machine")
+        self._buf = buf
+        self._sec = {}
+        for name, (off, fmt, count) in header["sections"].items():
+            size = array(fmt).itemsize
+            self._sec[name] = buf[off:off + count * size].cast(fmt)
+        self.num_facts = header["num_facts"]
+        self.entities = _Names(self._sec["ent_offs"], self._sec["ent_blob"])
+        self.relations = _Names(self._sec["rel_offs"], self._sec["rel_blob"])
+        self._n_ent = len(self.entities)
+        self._n_rel = len(self.relations)
+
+        self.by_rel_tail = _View(self._lookup_rel_tail)
+        self.by_hrt = _View(self._lookup_hrt)
+        self.by_head = _View(self._lookup_head)
+        self.by_tail = _View(self._lookup_tail)
+        self.by_head_rel = _View(self._lookup_head_rel)
+        self.rel_tail_starts = _View(self._lookup_rel_tail_starts)
+        self.rel_tail_by_end = _View(self._lookup_rel_tail_by_end)
+        self.rel_tail_ends = _View(self._lookup_rel_tail_ends)
+        self.rel_tail_max_dur = _View(self._lookup_rel_tail_max_dur)
+
+    def close(self):
+        for mv in self._sec.values():
+            mv.release()
+        self._sec = {}
+        self._buf.release()
+        self._mm.close()
+        self._file.close()
+
+    # ---- key helpers ----
+    def _range(self, group, key):
+        keys = self._sec[group + "_keys"]
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            offs = self._sec[group + "_offs"]
+            return offs[i], offs[i + 1]
+        return None
+
+    def _rt_range(self, rel, tail):
+        r, t = self.relations.id_of(rel), self.entities.id_of(tail)
+        if r is None or t is None:
+            return None
+        return self._range("rt", r * self._n_ent + t)
+
+    # ---- groupings ----
+    def _lookup_rel_tail(self, key):
+        rng = self._rt_range(*key)
+        if rng is None:
+            return None
+        return _Seq(self._row, *rng)
+
+    def _lookup_rel_tail_starts(self, key):
+        rng = self._rt_range(*key)
+        if rng is None:
+            return None
+        # a _Seq rather than a memoryview slice: slices would pin the buffer and block close()
+        start = self._sec["start"]
+        return _Seq(start.__getitem__, *rng)
+
+    def _lookup_rel_tail_by_end(self, key):
+        rng = self._rt_range(*key)
+        if rng is None:
+            return None
+        perm = self._sec["perm_rt_end"]
+        return _Seq(lambda i: self._row(perm[i]), *rng)
+
+    def _lookup_rel_tail_ends(self, key):
+        rng = self._rt_range(*key)
+        if rng is None:
+            return None
+        end, perm = self._sec["end"], self._sec["perm_rt_end"]
+        return _Seq(lambda i: end[perm[i]], *rng)
+
+    def _lookup_rel_tail_max_dur(self, key):
+        r, t = self.relations.id_of(key[0]), self.entities.id_of(key[1])
+        if r is None or t is None:
+            return None
+        keys = self._sec["rt_keys"]
+        k = r * self._n_ent + t
+        i = bisect_left(keys, k)
+        if i < len(keys) and keys[i] == k:
+            return self._sec["rt_maxdur"][i]
+        return None
+
+    def _lookup_hrt(self, key):
+        h, r, t = self.entities.id_of(key[0]), self.relations.id_of(key[1]), self.entities.id_of(key[2])
+        if h is None or r is None or t is None:
+            return None
+        rng = self._range("hrt", (h * self._n_rel + r) * self._n_ent + t)
+        if rng is None:
+            return None
+        start, end, perm = self._sec["start"], self._sec["end"], self._sec["perm_h"]
+        return [(start[perm[i]], end[perm[i]]) for i in range(*rng)]
+
+    def _lookup_head(self, head):
+        h = self.entities.id_of(head)
+        rng = None if h is None else self._range("h", h)
+        if rng is None:
+            return None
+        rel, tail, start, end, perm = (self._sec[k] for k in ("rel", "tail", "start", "end", "perm_h"))
+        rn, en = self.relations, self.entities
+        return [(rn[rel[j]], en[tail[j]], start[j], end[j]) for j in (perm[i] for i in range(*rng))]
+
+    def _lookup_tail(self, tail):
+        t = self.entities.id_of(tail)
+        rng = None if t is None else self._range("t", t)
+        if rng is None:
+            return None
+        head, rel, start, end, perm = (self._sec[k] for k in ("head", "rel", "start", "end", "perm_t"))
+        rn, en = self.relations, self.entities
+        return [(en[head[j]], rn[rel[j]], start[j], end[j]) for j in (perm[i] for i in range(*rng))]
+
+    def _lookup_head_rel(self, key):
+        h, r = self.entities.id_of(key[0]), self.relations.id_of(key[1])
+        if h is None or r is None:
+            return None
+        rng = self._range("hr", h * self._n_rel + r)
+        if rng is None:
+            return None
+        tail, start, end, perm = (self._sec[k] for k in ("tail", "start", "end", "perm_h"))
+        en = self.entities
+        return [(en[tail[j]], start[j], end[j]) for j in (perm[i] for i in range(*rng))]
+
+    def _row(self, i):
+        return (self.entities[self._sec["head"][i]], self._sec["start"][i], self._sec["end"][i])
+
+    def _rows(self, rows):
+        head, start, end = self._sec["head"], self._sec["start"], self._sec["end"]
+        en = self.entities
+        return [(en[head[i]], start[i], end[i]) for i in rows]
+
+    def rel_tail_from(self, rel: str, tail: str, start: int):
+        """Return by_rel_tail[(rel, tail)] segments with start >= `start` (bisect, no scan)."""
+        rng = self._rt_range(rel, tail)
+        if rng is None:
+            return []
+        lo = bisect_left(self._sec["start"], start, rng[0], rng[1])
+        return self._rows(range(lo, rng[1]))
+
+
+def _group_table(sorted_rows, keyfn):
+    keys, offs = array("q"), array("q")
+    prev = None
+    for pos, i in enumerate(sorted_rows):
+        k = keyfn(i)
+        if k != prev:
+            keys.append(k)
+            offs.append(pos)
+            prev = k
+    offs.append(len(sorted_rows))
+    return keys, offs
+
+
+def _names_table(names):
+    offs, blob = array("q", [0]), bytearray()
+    for name in names:
+        blob += name.encode("utf-8")
+        offs.append(len(blob))
+    return offs, array("B", blob)
+
+
+def build_corpus_index(texts, out_path):
+    """Parse TKG text chunks (same line format as PerContextIndex) into an mmap-able index file."""
+    facts = []
+    for text in texts:
+        for line in (text or "").splitlines():
+            m = _FACT_RE.search(line)
+            if not m:
+                continue
+            facts.append((m.group(1), m.group(2), m.group(3), int(m.group(4)), int(m.group(5))))
+    # IDs follow sorted name order so integer order matches the string order used by PerContextIndex
+    ent_names = sorted({f[0] for f in facts} | {f[2] for f in facts})
+    rel_names = sorted({f[1] for f in facts})
+    ent_id = {n: i for i, n in enumerate(ent_names)}
+    rel_id = {n: i for i, n in enumerate(rel_names)}
+    n_ent, n_rel = len(ent_names), len(rel_names)
+    rows = sorted(
+        ((rel_id[r], ent_id[t], s, e - s, ent_id[h], e) for (h, r, t, s, e) in facts),
+    )
+    head = array("i", (x[4] for x in rows))
+    rel = array("i", (x[0] for x in rows))
+    tail = array("i", (x[1] for x in rows))
+    start = array("q", (x[2] for x in rows))
+    end = array("q", (x[5] for x in rows))
+    del rows, facts
+    n = len(head)
+    perm_h = array("i", sorted(range(n), key=lambda i: (head[i], rel[i], tail[i], start[i], end[i] - start[i])))
+    perm_t = array("i", sorted(range(n), key=lambda i: (tail[i], rel[i], head[i], start[i], end[i] - start[i])))
+
+    sections = {}
+    sections["ent_offs"], sections["ent_blob"] = _names_table(ent_names)
+    sections["rel_offs"], sections["rel_blob"] = _names_table(rel_names)
+    perm_rt_end = array("i", sorted(range(n), key=lambda i: (rel[i], tail[i], end[i], end[i] - start[i], head[i])))
+    sections.update(head=head, rel=rel, tail=tail, start=start, end=end, perm_h=perm_h, perm_t=perm_t, perm_rt_end=perm_rt_end)
+    sections["rt_keys"], sections["rt_offs"] = _group_table(range(n), lambda i: rel[i] * n_ent + tail[i])
+    rt_offs = sections["rt_offs"]
+    sections["rt_maxdur"] = array("q", (
+        max(end[i] - start[i] for i in range(rt_offs[g], rt_offs[g + 1])) for g in range(len(rt_offs) - 1)
+    ))
+    sections["h_keys"], sections["h_offs"] = _group_table(perm_h, lambda i: head[i])
+    sections["hr_keys"], sections["hr_offs"] = _group_table(perm_h, lambda i: head[i] * n_rel + rel[i])
+    sections["hrt_keys"], sections["hrt_offs"] = _group_table(perm_h, lambda i: (head[i] * n_rel + rel[i]) * n_ent + tail[i])
+    sections["t_keys"], sections["t_offs"] = _group_table(perm_t, lambda i: tail[i])
+
+    # two passes: the header size depends on the offsets it records
+    hlen = 0
+    while True:
+        off = len(MAGIC) + 4 + hlen
+        layout = {}
+        for name, arr in sections.items():
+            off = (off + 7) & ~7
+            layout[name] = (off, arr.typecode, len(arr))
+            off += len(arr) * arr.itemsize
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "num_facts": n,
+            "sections": layout,
+        }).encode("utf-8")
+        if len(header) <= hlen:
+            header = header.ljust(hlen)
+            break
+        hlen = len(header) + 64
+
+    out_path = Path(out_path)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC)
+        f.write(hlen.to_bytes(4, "little"))
+        f.write(header)
+        for name, arr in sections.items():
+            f.write(b"\0" * (layout[name][0] - f.tell()))
+            arr.tofile(f)
+    tmp.replace(out_path)
+    return out_path
+
+
+def iter_unique_prompts(jsonl_path):
+    """Yield each distinct record `prompt` once, so questions sharing a graph don't duplicate its facts."""
+    seen = set()
+    with Path(jsonl_path).open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            prompt = json.loads(line).get("prompt", "")
+            digest = hashlib.sha1(prompt.encode("utf-8")).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            yield prompt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a corpus-level, mmap-able TKG index.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--jsonl", type=str, help="records whose distinct `prompt` texts form the corpus graph")
+    src.add_argument("--graph", type=str, help="plain text file of 'E<H> R<R> E<T> [<S>,<E>]' lines")
+    parser.add_argument("--out", type=str, required=True)
+    args = parser.parse_args()
+
+    if args.jsonl:
+        texts = iter_unique_prompts(args.jsonl)
+    else:
+        texts = [Path(args.graph).read_text(encoding="utf-8")]
+    out = build_corpus_index(texts, args.out)
+    idx = CorpusIndex(out)
+    print(json.dumps({"out": str(out), "facts": idx.num_facts, "entities": len(idx.entities), "relations": len(idx.relations)}))
+    idx.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,45 @@
+import gc
+import hashlib
 import re
-from collections import defaultdict
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+
+# characters str.splitlines() treats as line boundaries
+_LB = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+# one match per line (the first fact on it, like a per-line `search`); `\s` may not cross a line
+_WS = rf"[^\S{_LB}]"
+_FACT_LINE_RE = re.compile(
+    rf"(?:\A|(?<=[{_LB}]))[^{_LB}]*?\b(E\d+){_WS}+(R\d+){_WS}+(E\d+){_WS}*\[(\d+),(\d+)\][^{_LB}]*"
+)
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend cyclic GC while allocating many tuples; none of them form cycles."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+# attribute -> builder for lazily constructed index families
+_LAZY = {
+    "by_rel_tail": "_build_rel_tail",
+    "rel_tail_starts": "_build_rel_tail",
+    "rel_tail_by_end": "_build_rel_tail_end",
+    "rel_tail_ends": "_build_rel_tail_end",
+    "rel_tail_max_dur": "_build_rel_tail_end",
+    "by_hrt": "_build_hrt",
+    "by_head": "_build_head",
+    "by_head_rel": "_build_head",
+    "by_tail": "_build_tail",
+}
 
 
 class PerContextIndex:
@@ -13,28 +53,168 @@ class PerContextIndex:
     Builds:
       - by_rel_tail[(rel, tail)] -> list[(head, start, end)]
       - by_hrt[(head, rel, tail)] -> list[(start, end)]
+      - by_head[head] -> list[(rel, tail, start, end)]
+      - by_tail[tail] -> list[(head, rel, start, end)]
+      - by_head_rel[(head, rel)] -> list[(tail, start, end)]
+      - rel_tail_starts[(rel, tail)] -> list[start], parallel to by_rel_tail (for bisect)
+      - rel_tail_by_end[(rel, tail)] -> list[(head, start, end)] ordered by (end, duration, head)
+      - rel_tail_ends[(rel, tail)] -> list[end], parallel to rel_tail_by_end
+      - rel_tail_max_dur[(rel, tail)] -> longest duration in the bucket (bounds interval stabbing)
+
+    The text is parsed in a single regex pass into fact rows; buckets are sorted on composite
+    tuples without key functions. With lazy=True a family is only built on first attribute access.
+    Laziness is per family, not per key: the text is always parsed in full, since one key's bucket
+    needs a pass over every row anyway. A lazy index may be shared between threads (families are
+    built once and published whole).
+    Lazy builds are timed as the `index_build` stage of the optional PipelineStats `stats`.
+    """
+
+    def __init__(self, prompt_text: str, lazy: bool = False, stats=None):
+        self._build_lock = threading.Lock()
+        self.stats = stats
+        with _gc_paused():
+            # rows in text order: (head, rel, tail, start, end)
+            self._rows = [
+                (h, r, t, int(s), int(e)) for (h, r, t, s, e) in _FACT_LINE_RE.findall(prompt_text)
+            ] if prompt_text else []
+            if not lazy:
+                self._build_rel_tail()
+                self._build_rel_tail_end()
+                self._build_hrt()
+                self._build_head()
+                self._build_tail()
+                del self._rows
+
+    def __getattr__(self, name):
+        # only reached for attributes not built yet (lazy mode)
+        builder = _LAZY.get(name)
+        if builder is None:
+            raise AttributeError(name)
+        with self._build_lock:
+            if name not in self.__dict__:
+                if self.stats is None:
+                    with _gc_paused():
+                        getattr(self, builder)()
+                else:
+                    with self.stats.stage("index_build"), _gc_paused():
+                        getattr(self, builder)()
+        return self.__dict__[name]
+
+    def _build_rel_tail(self):
+        # bucket in one pass, then sort each bucket on a composite (start, duration, head) tuple
+        # natively; far cheaper than key= lambdas (or one global sort over string keys)
+        buckets = defaultdict(list)
+        for (h, r, t, s, e) in self._rows:
+            buckets[(r, t)].append((s, e - s, h, e))
+        by_rel_tail = defaultdict(list)
+        starts = {}
+        for key, seq in buckets.items():
+            seq.sort()
+            by_rel_tail[key] = [(h, s, e) for (s, _, h, e) in seq]
+            starts[key] = [s for (s, _, _, _) in seq]
+        # assign only once complete: other threads read published families without the lock
+        self.rel_tail_starts = starts
+        self.by_rel_tail = by_rel_tail
+
+    def _build_rel_tail_end(self):
+        buckets = defaultdict(list)
+        for (h, r, t, s, e) in self._rows:
+            buckets[(r, t)].append((e, e - s, h, s))
+        by_end, ends, max_dur = {}, {}, {}
+        for key, seq in buckets.items():
+            seq.sort()
+            by_end[key] = [(h, s, e) for (e, _, h, s) in seq]
+            ends[key] = [e for (e, _, _, _) in seq]
+            max_dur[key] = max(d for (_, d, _, _) in seq)
+        self.rel_tail_ends = ends
+        self.rel_tail_max_dur = max_dur
+        self.rel_tail_by_end = by_end
+
+    def _build_hrt(self):
+        buckets = defaultdict(list)
+        for (h, r, t, s, e) in self._rows:
+            buckets[(h, r, t)].append((s, e - s, e))
+        by_hrt = defaultdict(list)
+        for key, seq in buckets.items():
+            seq.sort()
+            by_hrt[key] = [(s, e) for (s, _, e) in seq]
+        self.by_hrt = by_hrt
+
+    def _build_head(self):
+        by_head = defaultdict(list)
+        by_head_rel = defaultdict(list)
+        for (h, r, t, s, e) in self._rows:
+            by_head[h].append((r, t, s, e))
+            by_head_rel[(h, r)].append((t, s, e))
+        self.by_head_rel = by_head_rel
+        self.by_head = by_head
+
+    def _build_tail(self):
+        by_tail = defaultdict(list)
+        for (h, r, t, s, e) in self._rows:
+            by_tail[t].append((h, r, s, e))
+        self.by_tail = by_tail
+
+    def rel_tail_from(self, rel: str, tail: str, start: int):
+        """Return by_rel_tail[(rel, tail)] segments with start >= `start` (bisect, no scan)."""
+        seq = self.by_rel_tail.get((rel, tail))
+        if not seq:
+            return []
+        return seq[bisect_left(self.rel_tail_starts[(rel, tail)], start):]
+
+
+class IndexCache:
     """
+    LRU of lazy PerContextIndex objects keyed by the SHA-256 of the context text, for
+    long-running processes that see the same contexts repeatedly. Thread-safe: concurrent
+    misses on one text build a single index, the other callers wait for it.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
 
-    def __init__(self, prompt_text: str):
-        self.by_rel_tail = defaultdict(list)
-        self.by_hrt = defaultdict(list)
-        if not prompt_text:
-            return
-        pattern = re.compile(r"\b(E\d+)\s+(R\d+)\s+(E\d+)\s*\[(\d+),(\d+)\]")
-        for line in prompt_text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            m = pattern.search(line)
-            if not m:
-                continue
-            head, rel, tail, s, e = m.group(1), m.group(2), m.group(3), int(m.group(4)), int(m.group(5))
-            self.by_rel_tail[(rel, tail)].append((head, s, e))
-            self.by_hrt[(head, rel, tail)].append((s, e))
-        # sort sequences by start then duration for consistency
-        for key, seq in list(self.by_rel_tail.items()):
-            self.by_rel_tail[key] = sorted(seq, key=lambda x: (x[1], (x[2]-x[1]), x[0]))
-        for key, seq in list(self.by_hrt.items()):
-            self.by_hrt[key] = sorted(seq, key=lambda x: (x[0], (x[1]-x[0])))
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
+    def get(self, text: str, key: str = None) -> PerContextIndex:
+        key = key or self.key(text)
+        while True:
+            with self._lock:
+                index = self._entries.get(key)
+                if index is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return index
+                done = self._building.get(key)
+                if done is None:
+                    done = self._building[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # another thread is building this context; take its result from the LRU
+            done.wait()
+        try:
+            index = PerContextIndex(text, lazy=True)
+            with self._lock:
+                self._entries[key] = index
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                del self._building[key]
+            done.set()
+        return index
 
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
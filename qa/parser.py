@@ -34,3 +34,101 @@ def parse_immediately_after(question: str) -> Optional[ImmediateAfterQuery]:
     )
 
 
+@dataclass
+class ImmediateBeforeQuery:
+    pivot_head: str
+    pivot_relation: str
+    pivot_tail: str
+    relation: str
+    tail: str
+
+
+@dataclass
+class GapQuery:
+    pivot_head: str
+    pivot_relation: str
+    pivot_tail: str
+    relation: str
+    tail: str
+    gap: int
+    direction: str  # "after" | "before"
+
+
+@dataclass
+class FirstLastQuery:
+    relation: str
+    tail: str
+    which: str  # "first" | "last"
+
+
+@dataclass
+class AtTimeQuery:
+    relation: str
+    tail: str
+    time: int
+
+
+# The templates below are anchored at the end of the question: a qualified variant such as
+# "... the first entity ... after E1 R1 E9" must not parse as the plain template (the rule would
+# hard-answer while ignoring the qualifier); it returns None and is left to MCTS.
+def parse_immediately_before(question: str) -> Optional[ImmediateBeforeQuery]:
+    """Find the entity that was the Rxx of Eyy immediately before Eaa Rbb Ecc"""
+    if not question:
+        return None
+    m = re.search(r"Find the entity that was the\s+(R\d+)\s+of\s+(E\d+)\s+immediately before\s+(E\d+)\s+(R\d+)\s+(E\d+)\s*\??\s*$", question)
+    if not m:
+        return None
+    return ImmediateBeforeQuery(
+        pivot_head=m.group(3),
+        pivot_relation=m.group(4),
+        pivot_tail=m.group(5),
+        relation=m.group(1),
+        tail=m.group(2),
+    )
+
+
+def parse_gap(question: str) -> Optional[GapQuery]:
+    """Find the entity that was the Rxx of Eyy N units after|before Eaa Rbb Ecc"""
+    if not question:
+        return None
+    m = re.search(r"Find the entity that was the\s+(R\d+)\s+of\s+(E\d+)\s+(\d+)\s+(?:time\s+)?units?\s+(after|before)\s+(E\d+)\s+(R\d+)\s+(E\d+)\s*\??\s*$", question)
+    if not m:
+        return None
+    return GapQuery(
+        pivot_head=m.group(5),
+        pivot_relation=m.group(6),
+        pivot_tail=m.group(7),
+        relation=m.group(1),
+        tail=m.group(2),
+        gap=int(m.group(3)),
+        direction=m.group(4),
+    )
+
+
+def parse_first_last(question: str) -> Optional[FirstLastQuery]:
+    """Find the first|last entity that was the Rxx of Eyy"""
+    if not question:
+        return None
+    m = re.search(r"Find the (first|last) entity that was the\s+(R\d+)\s+of\s+(E\d+)\s*\??\s*$", question)
+    if not m:
+        return None
+    return FirstLastQuery(relation=m.group(2), tail=m.group(3), which=m.group(1))
+
+
+def parse_at_time(question: str) -> Optional[AtTimeQuery]:
+    """Find the entity that was the Rxx of Eyy at time T | during T"""
+    if not question:
+        return None
+    m = re.search(r"Find the entity that was the\s+(R\d+)\s+of\s+(E\d+)\s+(?:at time|during)\s+(\d+)\s*\??\s*$", question)
+    if not m:
+        return None
+    return AtTimeQuery(relation=m.group(1), tail=m.group(2), time=int(m.group(3)))
+
+
+def parse_temporal_question(question: str):
+    """Parse any supported temporal question; None if no template matches."""
+    for parse in (parse_immediately_after, parse_immediately_before, parse_gap, parse_first_last, parse_at_time):
+        q = parse(question)
+        if q is not None:
+            return q
+    return None
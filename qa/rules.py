@@ -0,0 +1,187 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from submission.qa.parser import (
+    AtTimeQuery,
+    FirstLastQuery,
+    GapQuery,
+    ImmediateAfterQuery,
+    ImmediateBeforeQuery,
+)
+
+
+@dataclass
+class RuleResult:
+    """Outcome of the rule pre-screen.
+
+    `answer` is set when the rule fully determines the head (exactly one distinct head matches
+    exactly, or for immediate-after the shortest of the exact matches); otherwise `candidates` holds the tied heads, or the rule's top-k, for MCTS to re-rank.
+    """
+    answer: Optional[str] = None
+    candidates: List[str] = field(default_factory=list)
+
+
+def _rank(row, pos, t):
+    # (distance to t on the start/end column, duration, head)
+    return (abs(row[pos] - t), row[2] - row[1], row[0])
+
+
+def _nearest(seq, keys, pos, t, k, lo=None, hi=None):
+    """Top-k rows of `seq` by (|row[pos] - t|, duration, head) with lo < key < hi.
+
+    `keys` is the sorted column `pos` of `seq`; only the rows around bisect(t) are touched
+    (k on each side, plus the rest of any tied group at the boundary).
+    """
+    i = bisect_left(keys, t)
+    n = len(keys)
+    picked = []
+    j = i
+    while j < n and (hi is None or keys[j] < hi) and (lo is None or keys[j] > lo):
+        if len(picked) >= k and keys[j] != keys[j - 1]:
+            break
+        picked.append(seq[j])
+        j += 1
+    taken = 0
+    j = i - 1
+    while j >= 0 and (lo is None or keys[j] > lo) and (hi is None or keys[j] < hi):
+        if taken >= k and keys[j] != keys[j + 1]:
+            break
+        picked.append(seq[j])
+        taken += 1
+        j -= 1
+    picked.sort(key=lambda row: _rank(row, pos, t))
+    return picked[:k]
+
+
+def _exact(seq, keys, t):
+    """Distinct heads of the rows whose key equals t, shortest duration first (seq order)."""
+    i = bisect_left(keys, t)
+    heads = []
+    while i < len(keys) and keys[i] == t:
+        heads.append(seq[i][0])
+        i += 1
+    return list(dict.fromkeys(heads))
+
+
+def _decided(heads):
+    # only a single distinct head is an answer; ties go to MCTS as candidates
+    if len(heads) == 1:
+        return RuleResult(answer=heads[0])
+    return RuleResult(candidates=heads)
+
+
+def _pivot_bounds(index, q):
+    pivots = index.by_hrt.get((q.pivot_head, q.pivot_relation, q.pivot_tail), [])
+    if not pivots:
+        return None
+    # by_hrt is ordered by start, so the first entry has the earliest start
+    return pivots[0][0], max(e for (s, e) in pivots)
+
+
+def _after(index, key, t, lo, k, tie_break=False):
+    seq = index.by_rel_tail.get(key, [])
+    starts = index.rel_tail_starts.get(key, [])
+    heads = _exact(seq, starts, t)
+    if heads and tie_break:
+        # the immediate-after pre-screen has always answered ties with the shortest duration
+        return RuleResult(answer=heads[0])
+    if heads:
+        return _decided(heads)
+    return RuleResult(candidates=[r[0] for r in _nearest(seq, starts, 1, t, k, lo=lo)])
+
+
+def _before(index, key, t, hi, k):
+    seq = index.rel_tail_by_end.get(key, [])
+    ends = index.rel_tail_ends.get(key, [])
+    heads = _exact(seq, ends, t)
+    if heads:
+        return _decided(heads)
+    return RuleResult(candidates=[r[0] for r in _nearest(seq, ends, 2, t, k, hi=hi)])
+
+
+def _at_time(index, key, t, k):
+    """Heads whose segment covers t, else the top-k nearest on either side.
+
+    How many segments cover t is known from two bisects: every segment that starts by t,
+    minus those that already ended. Listing them scans the smaller of two windows, starts in
+    [t - max_dur, t] or ends in [t, t + max_dur], and stops once all are found. One long
+    segment widens both windows, so in the worst case that scan is linear in the bucket.
+    """
+    seq = index.by_rel_tail.get(key, [])
+    if not seq:
+        return RuleResult()
+    starts = index.rel_tail_starts.get(key)
+    by_end = index.rel_tail_by_end.get(key, [])
+    ends = index.rel_tail_ends.get(key, [])
+    max_dur = index.rel_tail_max_dur.get(key, 0)
+    hi = bisect_left(starts, t + 1)
+    first_end = bisect_left(ends, t)
+    count = hi - first_end
+    if count > 0:
+        lo = bisect_left(starts, t - max_dur)
+        last_end = bisect_left(ends, t + max_dur + 1)
+        if hi - lo <= last_end - first_end:
+            window = (seq[i] for i in range(hi - 1, lo - 1, -1))
+        else:
+            window = (by_end[i] for i in range(first_end, last_end))
+        covering = []
+        for row in window:
+            if row[1] <= t <= row[2]:
+                covering.append(row)
+                if len(covering) == count:
+                    break
+        covering.sort(key=lambda r: (r[2] - r[1], r[0]))
+        return _decided(list(dict.fromkeys(r[0] for r in covering)))
+    # nothing covers t: nearest segments starting after t or ending before it
+    later = _nearest(seq, starts, 1, t, k, lo=t)
+    earlier = _nearest(by_end, ends, 2, t, k, hi=t)
+    ranked = sorted(
+        [(_rank(r, 1, t), r) for r in later] + [(_rank(r, 2, t), r) for r in earlier],
+        key=lambda x: x[0],
+    )
+    return RuleResult(candidates=[r[0] for (_, r) in ranked[:k]])
+
+
+def _first_last(index, key, which):
+    if which == "first":
+        seq = index.by_rel_tail.get(key, [])
+        if not seq:
+            return RuleResult()
+        starts = index.rel_tail_starts.get(key)
+        return _decided(_exact(seq, starts, starts[0]))
+    seq = index.rel_tail_by_end.get(key, [])
+    if not seq:
+        return RuleResult()
+    ends = index.rel_tail_ends.get(key)
+    # every head tied on the latest end
+    return _decided(_exact(seq, ends, ends[-1]))
+
+
+def resolve(index, query, top_k: int = 2) -> Optional[RuleResult]:
+    """Apply the rule for `query` over an index (PerContextIndex or CorpusIndex).
+
+    Returns None when the rule cannot be applied (unknown query type or missing pivot).
+    Lookups bisect the start/end-sorted buckets, so cost is logarithmic in the bucket size
+    plus the handful of rows returned (at-time queries excepted, see _at_time).
+    """
+    if query is None:
+        return None
+    key = (query.relation, query.tail)
+    if isinstance(query, FirstLastQuery):
+        return _first_last(index, key, query.which)
+    if isinstance(query, AtTimeQuery):
+        return _at_time(index, key, query.time, top_k)
+    bounds = _pivot_bounds(index, query)
+    if bounds is None:
+        return None
+    pivot_start, pivot_end = bounds
+    if isinstance(query, ImmediateAfterQuery):
+        return _after(index, key, pivot_end, pivot_end, top_k, tie_break=True)
+    if isinstance(query, ImmediateBeforeQuery):
+        return _before(index, key, pivot_start, pivot_start, top_k)
+    if isinstance(query, GapQuery):
+        if query.direction == "after":
+            return _after(index, key, pivot_end + query.gap, pivot_end, top_k)
+        return _before(index, key, pivot_start - query.gap, pivot_start, top_k)
+    return None
@@ -0,0 +1,177 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from submission.qa.index import PerContextIndex
+from submission.scripts.gen_synthetic import generate_record
+from submission.scripts.run_demo import DummyLLM
+from submission.vendor.rekgmcts.mcts import MCTSPathFinder
+from submission.vendor_adapter.tkg_backend import TKGBackend
+
+
+class _CountingFinder(MCTSPathFinder):
+    """MCTSPathFinder that counts expansions (one per search iteration)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expansions = 0
+
+    def _expand(self, node):
+        self.expansions += 1
+        return super()._expand(node)
+
+
+def _latency_stats(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"n": 0}
+    return {
+        "n": len(samples),
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6,
+    }
+
+
+def bench_size(num_facts, args):
+    rng = random.Random(args.seed)
+    num_entities = max(3, int(num_facts * args.entities_per_fact))
+    rec = generate_record(rng, num_entities, args.relations, num_facts, args.interval_density, chain_fraction=args.chain_fraction)
+    text, question = rec["prompt"], rec["question"]
+    result = {"facts": num_facts, "entities": num_entities, "relations": args.relations}
+
+    t0 = time.perf_counter()
+    index = PerContextIndex(text)
+    result["index_build_s"] = time.perf_counter() - t0
+
+    if not args.no_memory:
+        del index
+        tracemalloc.start()
+        index = PerContextIndex(text)
+        result["index_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    backend = TKGBackend(index, question=question)
+    meta = backend.get_temporal_meta()
+    entities = [f"E{rng.randrange(num_entities)}" for _ in range(args.calls)]
+    if meta:
+        # always include the target tail so the temporal-masking branch is exercised
+        entities[0] = meta["target_tail"]
+    relations = [f"R{rng.randrange(args.relations)}" for _ in range(args.calls)]
+
+    lat = []
+    for ent in entities:
+        backend._rel_cache.clear()
+        t0 = time.perf_counter()
+        backend.relation_search_prune(ent, ent, [], -1, question)
+        lat.append(time.perf_counter() - t0)
+    result["relation_search_prune"] = _latency_stats(lat)
+
+    lat = []
+    for i, (ent, rel) in enumerate(zip(entities, relations)):
+        if i == 0 and meta:
+            rel = meta["target_rel"]
+        backend._ent_cache.clear()
+        t0 = time.perf_counter()
+        backend.entity_search(ent, rel, head=bool(i % 2))
+        lat.append(time.perf_counter() - t0)
+    result["entity_search"] = _latency_stats(lat)
+
+    # MCTS on the unmasked graph: the demo's pinned search (target relation only, masked by the
+    # pivot) runs out of nodes after a few expansions, which would time setup, not iterations
+    topic = meta["target_tail"] if meta else entities[0]
+    finder = _CountingFinder(
+        question=question,
+        topic_entities={topic: topic},
+        llm=DummyLLM(latency=args.llm_latency),
+        max_depth=args.mcts_depth,
+        num_retain_entity=2,
+        max_iterations=args.mcts_iterations,
+        # DummyLLM always scores 0.8; keep searching until max_iterations
+        score_threshold=1.0,
+        exploration_constant=0.5,
+        prune_min_candidates=2,
+        eval_concurrency=args.eval_concurrency,
+        backend=TKGBackend(index),
+        search_workers=args.search_workers,
+        seed=args.seed,
+    )
+    t0 = time.perf_counter()
+    finder.search()
+    elapsed = time.perf_counter() - t0
+    result["mcts"] = {
+        "iterations": finder.expansions,
+        "seconds": elapsed,
+        "iterations_per_s": (finder.expansions / elapsed) if elapsed else 0.0,
+        "stop_reason": finder.stop_reason,
+        # iterations_per_s is only comparable between runs that reached max_iterations
+        "stopped_early": finder.stop_reason != "max_iterations",
+    }
+    return result
+
+
+def compare(current, baseline_path):
+    """Print current/baseline ratios for the headline metrics of matching sizes."""
+    baseline = {r["facts"]: r for r in json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]}
+    for r in current["results"]:
+        b = baseline.get(r["facts"])
+        if not b:
+            continue
+        rows = {
+            "index_build_s": (r.get("index_build_s"), b.get("index_build_s")),
+            "index_peak_mb": (r.get("index_peak_mb"), b.get("index_peak_mb")),
+            "relation_search_prune.p50_us": (r["relation_search_prune"].get("p50_us"), b["relation_search_prune"].get("p50_us")),
+            "entity_search.p50_us": (r["entity_search"].get("p50_us"), b["entity_search"].get("p50_us")),
+            "mcts.iterations_per_s": (r.get("mcts", {}).get("iterations_per_s"), b.get("mcts", {}).get("iterations_per_s")),
+        }
+        for name, (cur, base) in rows.items():
+            if cur is None or not base:
+                continue
+            print(f"{r['facts']:>9} {name:<30} {cur:12.3f} {base:12.3f} x{cur / base:.2f}")
+        if r.get("mcts", {}).get("stopped_early") or b.get("mcts", {}).get("stopped_early"):
+            print(f"{r['facts']:>9} mcts stopped before max_iterations ({r.get('mcts', {}).get('stop_reason')} / {b.get('mcts', {}).get('stop_reason')}); iterations_per_s not comparable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PerContextIndex / TKGBackend / MCTSPathFinder on synthetic graphs.")
+    parser.add_argument("--sizes", type=str, default="1000,100000,1000000", help="comma-separated facts per context")
+    parser.add_argument("--entities-per-fact", type=float, default=0.1)
+    parser.add_argument("--relations", type=int, default=20)
+    parser.add_argument("--interval-density", type=float, default=2.0)
+    parser.add_argument("--chain-fraction", type=float, default=0.001)
+    parser.add_argument("--calls", type=int, default=200, help="sampled backend calls per size")
+    parser.add_argument("--mcts-iterations", type=int, default=20)
+    parser.add_argument("--mcts-depth", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake LLM latency in seconds")
+    parser.add_argument("--eval-concurrency", type=int, default=1)
+    parser.add_argument("--search-workers", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=None, help="write results as JSON")
+    parser.add_argument("--compare", type=str, default=None, help="baseline JSON from a previous --out")
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(x) for x in args.sizes.split(",") if x.strip()):
+        res = bench_size(size, args)
+        results.append(res)
+        print(json.dumps(res), flush=True)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import json
+import random
+from pathlib import Path
+
+
+def _answer(pivot_end, segs):
+    """Rule answer for an immediate-after question, mirroring run_demo's pre-screen."""
+    exact = [(h, s, e) for (h, s, e) in segs if s == pivot_end]
+    if exact:
+        return min(exact, key=lambda x: (x[2] - x[1], x[0]))[0]
+    later = [(h, s, e) for (h, s, e) in segs if s > pivot_end]
+    if later:
+        return min(later, key=lambda x: (x[1], x[2] - x[1], x[0]))[0]
+    return None
+
+
+def generate_record(rng: random.Random, num_entities: int, num_relations: int, num_facts: int,
+                    interval_density: float = 2.0, max_duration: int = 10, chain_fraction: float = 0.01):
+    """Build one "immediately after" record whose context has `num_facts` facts.
+
+    A chain of `chain_fraction * num_facts` facts shares the target (relation, tail); the rest
+    are uniform noise. `interval_density` is the expected number of chain intervals covering
+    any time point, which fixes the time horizon.
+    """
+    num_entities = max(3, num_entities)
+    num_relations = max(1, num_relations)
+    num_facts = max(2, num_facts)
+    chain_len = max(2, int(num_facts * chain_fraction))
+    mean_dur = (1 + max_duration) / 2
+    horizon = max(2, int(chain_len * mean_dur / max(interval_density, 1e-9)))
+
+    def interval():
+        s = rng.randrange(horizon)
+        return s, s + rng.randint(1, max_duration)
+
+    rel = f"R{rng.randrange(num_relations)}"
+    tail = f"E{rng.randrange(num_entities)}"
+    pivot_head = tail
+    while pivot_head == tail:
+        pivot_head = f"E{rng.randrange(num_entities)}"
+
+    lines = []
+    segs = []
+    ps, pe = interval()
+    lines.append(f"{pivot_head} {rel} {tail} [{ps},{pe}]")
+    segs.append((pivot_head, ps, pe))
+    for _ in range(chain_len - 1):
+        h = f"E{rng.randrange(num_entities)}"
+        s, e = interval()
+        lines.append(f"{h} {rel} {tail} [{s},{e}]")
+        segs.append((h, s, e))
+    pivot_end = max(e for (h, s, e) in segs if h == pivot_head)
+    if _answer(pivot_end, segs) is None:
+        h = pivot_head
+        while h in (pivot_head, tail):
+            h = f"E{rng.randrange(num_entities)}"
+        s = pivot_end + rng.randint(0, 3)
+        e = s + rng.randint(1, max_duration)
+        lines.append(f"{h} {rel} {tail} [{s},{e}]")
+        segs.append((h, s, e))
+    while len(lines) < num_facts:
+        h, r, t = f"E{rng.randrange(num_entities)}", f"R{rng.randrange(num_relations)}", f"E{rng.randrange(num_entities)}"
+        if r == rel and t == tail:
+            # keep noise off the target (relation, tail) so the label stays as computed
+            continue
+        s, e = interval()
+        lines.append(f"{h} {r} {t} [{s},{e}]")
+    rng.shuffle(lines)
+    return {
+        "question_type": "before_after",
+        "question": f"Find the entity that was the {rel} of {tail} immediately after {pivot_head} {rel} {tail}",
+        "label": _answer(pivot_end, segs),
+        "prompt": "\n".join(lines),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic 'immediately after' TKG questions as JSONL.")
+    parser.add_argument("--out", type=str, required=True)
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--entities", type=int, default=1000)
+    parser.add_argument("--relations", type=int, default=20)
+    parser.add_argument("--facts", type=int, default=1000, help="facts per context")
+    parser.add_argument("--interval-density", type=float, default=2.0, help="expected overlapping target intervals per time point")
+    parser.add_argument("--max-duration", type=int, default=10)
+    parser.add_argument("--chain-fraction", type=float, default=0.01, help="share of facts on the target (relation, tail)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with Path(args.out).open("w", encoding="utf-8") as f:
+        for _ in range(args.records):
+            rec = generate_record(rng, args.entities, args.relations, args.facts,
+                                  args.interval_density, args.max_duration, args.chain_fraction)
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
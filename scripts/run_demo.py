@@ -1,17 +1,36 @@
 import argparse
 import json
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
 
+from submission.qa.corpus_index import CorpusIndex
+from submission.qa.rules import resolve
 from submission.vendor.rekgmcts.mcts import MCTSPathFinder
+from submission.vendor_adapter.instrumentation import PipelineStats, summarize_stats
+from submission.vendor_adapter.llm_cache import CachedLLM
 from submission.vendor_adapter.tkg_backend import TKGBackend
-import submission.vendor_adapter as vad
 
 
 class DummyLLM:
+    def __init__(self, latency: float = 0.0):
+        # artificial per-round-trip latency (seconds) to mimic a remote model
+        self.latency = latency
+
     def __call__(self, prompt):
         # Always return a moderate score text; replace with real API in production
+        if self.latency:
+            time.sleep(self.latency)
         return ["0.8\nRelevant to the question."]
 
+    def batch(self, prompts):
+        # one round trip for the whole batch
+        if self.latency:
+            time.sleep(self.latency)
+        return [["0.8\nRelevant to the question."] for _ in prompts]
+
 
 def load_jsonl(path: Path):
     with path.open("r", encoding="utf-8") as f:
@@ -22,81 +41,231 @@ def load_jsonl(path: Path):
             yield json.loads(line)
 
 
+def iter_chunks(path: Path, chunksize: int):
+    """Yield lists of at most `chunksize` raw JSONL lines without reading the whole file."""
+    with path.open("r", encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        while True:
+            chunk = list(islice(lines, chunksize))
+            if not chunk:
+                return
+            yield chunk
+
+
+def build_llm(args):
+    llm = DummyLLM(latency=args.llm_latency)
+    if args.llm_cache:
+        llm = CachedLLM(llm, args.llm_cache, max_entries=args.llm_cache_max_entries)
+    return llm
+
+
+def _budgeted(args):
+    return any(v is not None for v in (args.deadline_ms, args.max_llm_calls, args.max_llm_tokens, args.widening_k))
+
+
+def answer_record(rec, llm, args, corpus=None):
+    """Run rule pre-screen + MCTS for one record and return its result line.
+
+    `corpus`, when given, is a prebuilt index (CorpusIndex or a cached PerContextIndex) used
+    instead of indexing the record's prompt.
+    """
+    stats = PipelineStats() if args.instrument else None
+    t_start = time.perf_counter()
+    question = rec.get("question", "")
+    backend = TKGBackend(corpus if corpus is not None else rec.get("prompt", ""), question=question, stats=stats)
+
+    t0 = time.perf_counter()
+    # rule pre-screen (qa.rules): an exact temporal match answers directly; otherwise the
+    # rule's top-2 heads become the MCTS whitelist
+    query = backend.q
+    rule = resolve(backend.index, query)
+    # topic entities: pin to the target tail
+    topic_entities = {query.tail: query.tail} if rule is not None else {"E0": "E0"}
+
+    pred = None
+    path = []
+    stop = None
+    if rule is not None:
+        if rule.answer is not None:
+            pred = rule.answer
+            path = [(rule.answer, query.relation, query.tail)]
+        else:
+            backend.allowed_heads = set(rule.candidates)
+    if stats is not None:
+        stats.add_time("rule_prescreen", time.perf_counter() - t0)
+        stats.rule_answered = pred is not None
+
+    if pred is None:
+        t0 = time.perf_counter()
+        finder = MCTSPathFinder(
+            question=question,
+            topic_entities=topic_entities,
+            llm=llm,
+            max_depth=3,
+            num_retain_entity=2,
+            max_iterations=5,
+            score_threshold=0.8,
+            exploration_constant=0.5,
+            prune_min_candidates=2,
+            eval_concurrency=args.eval_concurrency,
+            backend=backend,
+            stats=stats,
+            search_workers=args.search_workers,
+            seed=args.seed,
+            deadline_s=args.deadline_ms / 1000 if args.deadline_ms is not None else None,
+            max_llm_calls=args.max_llm_calls,
+            max_llm_tokens=args.max_llm_tokens,
+            widening_k=args.widening_k,
+            widening_alpha=args.widening_alpha,
+        )
+        path = finder.search()
+        pred = path[-1][0] if path else None
+        stop = finder.stop_reason
+        if stats is not None:
+            stats.add_time("mcts", time.perf_counter() - t0)
+    backend.allowed_heads = None
+
+    label = rec.get("label")
+    res = {"pred": pred, "label": label, "correct": int(pred == label), "path": path}
+    if stop is not None and _budgeted(args):
+        res["stop"] = stop
+    if stats is not None:
+        stats.add_time("total", time.perf_counter() - t_start)
+        res["stats"] = stats.as_dict()
+    return res
+
+
+# per-worker state for the pooled runner (one copy per process, shared by threads)
+_worker = {}
+
+
+def _init_worker(args):
+    _worker["args"] = args
+    _worker["llm"] = build_llm(args)
+    _worker["corpus"] = CorpusIndex(args.corpus_index) if args.corpus_index else None
+
+
+def _run_chunk(lines):
+    args, llm, corpus = _worker["args"], _worker["llm"], _worker["corpus"]
+    before = llm.stats() if isinstance(llm, CachedLLM) else None
+    results = [answer_record(json.loads(line), llm, args, corpus) for line in lines]
+    # cache counters live in each worker process; ship the delta back with the chunk
+    delta = None
+    if before is not None:
+        after = llm.stats()
+        delta = {"hits": after["hits"] - before["hits"], "misses": after["misses"] - before["misses"]}
+    return results, delta
+
+
+def run_pooled(args, src: Path, emit):
+    """Stream `src` through a thread/process pool, keeping at most 2*workers chunks in flight."""
+    if args.pool == "process":
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args,))
+    else:
+        _init_worker(args)
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+    cache = {"hits": 0, "misses": 0}
+    pending = deque()
+    max_in_flight = 2 * args.workers
+
+    def drain(block_all=False):
+        while pending and (block_all or len(pending) >= max_in_flight):
+            if args.ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [f for f in pending if f in finished]
+                for f in done:
+                    pending.remove(f)
+            for fut in done:
+                results, delta = fut.result()
+                if delta:
+                    cache["hits"] += delta["hits"]
+                    cache["misses"] += delta["misses"]
+                for res in results:
+                    emit(res)
+
+    with pool:
+        for chunk in iter_chunks(src, args.chunksize):
+            pending.append(pool.submit(_run_chunk, chunk))
+            drain()
+        drain(block_all=True)
+
+    llm = _worker.get("llm")
+    if args.pool == "thread" and isinstance(llm, CachedLLM):
+        stats = llm.stats()
+        llm.close()
+        return stats
+    if args.llm_cache:
+        total = cache["hits"] + cache["misses"]
+        return {**cache, "hit_rate": (cache["hits"] / total) if total else 0.0}
+    return None
+
+
+def add_search_args(parser):
+    """Flags shared by run_demo and serve: LLM, caches, MCTS settings and budgets."""
+    parser.add_argument("--corpus-index", type=str, default=None, help="shared mmap index (see qa/corpus_index.py) used instead of each record's prompt")
+    parser.add_argument("--eval-concurrency", type=int, default=1, help="max LLM evaluations in flight per expansion (1 = sequential)")
+    parser.add_argument("--search-workers", type=int, default=1, help="tree-parallel MCTS workers with virtual loss (1 = sequential)")
+    parser.add_argument("--seed", type=int, default=None, help="seed MCTS randomness for reproducible runs")
+    parser.add_argument("--deadline-ms", type=float, default=None, help="per-question MCTS wall-time budget; the best path so far is returned")
+    parser.add_argument("--max-llm-calls", type=int, default=None, help="per-question LLM call budget for MCTS")
+    parser.add_argument("--max-llm-tokens", type=int, default=None, help="per-question LLM token budget for MCTS (~4 chars per token)")
+    parser.add_argument("--widening-k", type=float, default=None, help="progressive widening: at most ceil(k * visits ** alpha) children per node")
+    parser.add_argument("--widening-alpha", type=float, default=0.5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="artificial DummyLLM latency in seconds")
+    parser.add_argument("--llm-cache", type=str, default=None, help="SQLite file for a persistent LLM response cache")
+    parser.add_argument("--llm-cache-max-entries", type=int, default=100_000)
+    parser.add_argument("--instrument", action="store_true", help="add per-stage timings/counters to each result and percentiles to the summary")
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", type=str, default=str(Path(__file__).resolve().parents[2] / "submission" / "sample" / "demo.jsonl"))
+    parser.add_argument("--workers", type=int, default=0, help="0 = run records inline; N > 0 = stream through a pool of N workers")
+    parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+    parser.add_argument("--chunksize", type=int, default=16, help="records per pool task")
+    parser.add_argument("--ordered", action="store_true", help="emit results in input order (default: as they finish)")
+    add_search_args(parser)
     args = parser.parse_args()
 
     src = Path(args.input)
-    total = 0
-    answered = 0
-    correct = 0
-
-    for rec in load_jsonl(src):
-        total += 1
-        question = rec.get("question", "")
-        backend = TKGBackend(rec.get("prompt", ""), question=question)
-        vad.current_backend = backend
-
-        # monkey patch hooks expected by MCTS
-        import submission.vendor.rekgmcts.mcts as mcts_mod
-        mcts_mod.relation_search_prune = lambda entity_id, entity_name, pre_relations, pre_head, question, llm: backend.relation_search_prune(entity_id, entity_name, pre_relations, pre_head, question, llm)
-        mcts_mod.entity_search = lambda entity, relation, head=True: backend.entity_search(entity, relation, head)
-        mcts_mod.get_entity_name = lambda entity_id: backend.get_entity_name(entity_id)
-        mcts_mod.llm = DummyLLM()
-
-        # topic entities: pin to target tail for immediate-after demo
-        meta = backend.get_temporal_meta(question)
-        topic_entities = {meta["target_tail"]: meta["target_tail"]} if meta else {"E0": "E0"}
-
-        # rule pre-screen: if exact immediate-after exists, return it directly
-        pred = None
-        path = []
-        if meta:
-            pivot_end = meta["pivot_end"]
-            segs = backend.get_target_segments(meta["target_rel"], meta["target_tail"])
-            exact = [(h, s, e) for (h, s, e) in segs if s == pivot_end]
-            if exact:
-                h, s, e = sorted(exact, key=lambda x: (x[2] - x[1], x[0]))[0]
-                pred = h
-                path = [(h, meta["target_rel"], meta["target_tail"])]
-            else:
-                later = [(h, s, e) for (h, s, e) in segs if s > pivot_end]
-                ordered = sorted(later, key=lambda x: (x[1], x[2] - x[1], x[0]))
-                whitelist = [t[0] for t in ordered[:2]]
-                backend.allowed_heads = set(whitelist)
-
-        if pred is None:
-            finder = MCTSPathFinder(
-                question=question,
-                topic_entities=topic_entities,
-                llm=mcts_mod.llm,
-                max_depth=3,
-                num_retain_entity=2,
-                max_iterations=5,
-                score_threshold=0.8,
-                exploration_constant=0.5,
-                prune_min_candidates=2,
-            )
-            path = finder.search()
-            pred = path[-1][0] if path else None
-        backend.allowed_heads = None
-
-        label = rec.get("label")
-        ok = int(pred == label)
-        answered += 1 if pred is not None else 0
-        correct += ok
-        print(json.dumps({"pred": pred, "label": label, "correct": ok, "path": path}, ensure_ascii=False))
-
-    print(json.dumps({
+    counts = {"total": 0, "answered": 0, "correct": 0}
+    record_stats = []
+
+    def emit(res):
+        if "stats" in res:
+            record_stats.append(res["stats"])
+        counts["total"] += 1
+        counts["answered"] += 1 if res["pred"] is not None else 0
+        counts["correct"] += res["correct"]
+        print(json.dumps(res, ensure_ascii=False), flush=args.workers > 0)
+
+    if args.workers > 0:
+        cache_stats = run_pooled(args, src, emit)
+    else:
+        corpus = CorpusIndex(args.corpus_index) if args.corpus_index else None
+        llm = build_llm(args)
+        for rec in load_jsonl(src):
+            emit(answer_record(rec, llm, args, corpus))
+        cache_stats = None
+        if isinstance(llm, CachedLLM):
+            cache_stats = llm.stats()
+            llm.close()
+
+    total, answered, correct = counts["total"], counts["answered"], counts["correct"]
+    summary = {
         "total": total,
         "answered": answered,
         "accuracy_on_answered": (correct/answered) if answered else 0.0,
         "overall_accuracy": (correct/total) if total else 0.0,
-    }, ensure_ascii=False, indent=2))
+    }
+    if cache_stats is not None:
+        summary["llm_cache"] = cache_stats
+    if args.instrument:
+        summary["stats"] = summarize_stats(record_stats)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,199 @@
+import argparse
+import json
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from submission.qa.corpus_index import CorpusIndex
+from submission.qa.index import IndexCache
+from submission.scripts.run_demo import add_search_args, answer_record, build_llm
+from submission.vendor_adapter.llm_cache import CachedLLM
+
+
+class QueryService:
+    """
+    Long-lived answerer: one LLM (and its disk cache), an optional CorpusIndex and an LRU of
+    per-context indexes stay warm across requests. Requests for the same (context, question)
+    that arrive while one is being computed share that computation.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.llm = build_llm(args)
+        self.corpus = CorpusIndex(args.corpus_index) if args.corpus_index else None
+        self.indexes = IndexCache(args.index_cache_size)
+        self._pool = ThreadPoolExecutor(max_workers=args.threads)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counts = {"requests": 0, "computed": 0, "merged": 0, "errors": 0}
+
+    def submit(self, rec):
+        """Future for the result of `rec` (a run_demo record: prompt, question[, label])."""
+        prompt = rec.get("prompt") or ""
+        ctx = IndexCache.key(prompt) if self.corpus is None else None
+        key = (ctx, rec.get("question", ""))
+        with self._lock:
+            self.counts["requests"] += 1
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.counts["merged"] += 1
+                return fut
+            self.counts["computed"] += 1
+            fut = self._pool.submit(self._answer, rec, prompt, ctx)
+            self._inflight[key] = fut
+        fut.add_done_callback(lambda f: self._finished(key, f))
+        return fut
+
+    def _answer(self, rec, prompt, ctx):
+        index = self.corpus if self.corpus is not None else self.indexes.get(prompt, ctx)
+        return answer_record(rec, self.llm, self.args, index)
+
+    def _finished(self, key, fut):
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+            if fut.exception() is not None:
+                self.counts["errors"] += 1
+
+    def answer(self, rec):
+        """Blocking submit(); errors are returned as {"error": ...} instead of raised."""
+        try:
+            res = dict(self.submit(rec).result())
+        except Exception as exc:
+            res = {"error": f"{type(exc).__name__}: {exc}"}
+        else:
+            # a merged request shares pred/path, but label/correct are its own
+            res["label"] = rec.get("label")
+            res["correct"] = int(res["pred"] == res["label"])
+        if "id" in rec:
+            res["id"] = rec["id"]
+        return res
+
+    def stats(self):
+        with self._lock:
+            out = {**self.counts, "in_flight": len(self._inflight)}
+        out["index_cache"] = self.indexes.stats()
+        if isinstance(self.llm, CachedLLM):
+            out["llm_cache"] = self.llm.stats()
+        return out
+
+    def close(self):
+        """Finish queued work, release the LLM cache and return the final stats()."""
+        self._pool.shutdown(wait=True)
+        stats = self.stats()
+        if isinstance(self.llm, CachedLLM):
+            self.llm.close()
+        return stats
+
+
+def _parse_request(body):
+    """Parsed request record, or an error payload string if `body` is not a JSON object."""
+    try:
+        rec = json.loads(body)
+    except ValueError as exc:
+        return None, f"bad request: {exc}"
+    if not isinstance(rec, dict):
+        return None, f"bad request: expected a JSON object, got {type(rec).__name__}"
+    return rec, None
+
+
+def serve_stdio(service, max_in_flight):
+    """One JSON record per stdin line -> one result line on stdout, written as it finishes.
+
+    Results carry the request's "id" (if any) since they may come back out of order.
+    """
+    out_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_in_flight)
+
+    def respond(rec):
+        try:
+            res = service.answer(rec)
+            with out_lock:
+                sys.stdout.write(json.dumps(res, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as responders:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            rec, error = _parse_request(line)
+            if error is not None:
+                with out_lock:
+                    sys.stdout.write(json.dumps({"error": error}) + "\n")
+                    sys.stdout.flush()
+                continue
+            slots.acquire()
+            responders.submit(respond, rec)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # POST /query with a JSON record -> JSON result; GET /stats -> service counters
+
+    def do_POST(self):
+        if self.path != "/query":
+            return self._send(404, {"error": "not found"})
+        rec, error = _parse_request(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if error is not None:
+            return self._send(400, {"error": error})
+        res = self.server.service.answer(rec)
+        self._send(500 if "error" in res else 200, res)
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._send(404, {"error": "not found"})
+        self._send(200, self.server.service.stats())
+
+    def _send(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_http(service, host, port):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"listening on http://{host}:{server.server_address[1]}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve questions from a warm process (stdin/stdout JSONL or localhost HTTP).")
+    parser.add_argument("--http", type=int, default=None, metavar="PORT", help="serve HTTP on PORT instead of stdin/stdout")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--threads", type=int, default=8, help="questions computed concurrently")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="stdin mode: requests read ahead of their results")
+    parser.add_argument("--index-cache-size", type=int, default=64, help="per-context indexes kept (LRU by context hash)")
+    add_search_args(parser)
+    args = parser.parse_args()
+
+    service = QueryService(args)
+    # exit through the finally below (final stats, cache close) on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.http is not None:
+            serve_http(service, args.host, args.http)
+        else:
+            serve_stdio(service, args.max_in_flight)
+    finally:
+        print(json.dumps(service.close(), ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import random
+
+from submission.qa.index import PerContextIndex
+from submission.tests import baseline
+from submission.tests.test_index import random_facts
+from submission.vendor_adapter.tkg_backend import TKGBackend
+
+
+def test_matches_baseline_backend():
+    rng = random.Random(0)
+    for trial in range(150):
+        ne, nr = rng.randint(2, 15), rng.randint(1, 4)
+        text = random_facts(rng, rng.randint(0, 200), ne, nr)
+        lines = text.splitlines()
+        if lines and rng.random() < 0.8:
+            h, r, t, _ = lines[rng.randrange(len(lines))].split()
+            question = f"Find the entity that was the R{rng.randrange(nr)} of E{rng.randrange(ne)} immediately after {h} {r} {t}"
+        else:
+            question = "what?"
+        old, new = baseline.TKGBackend(text, question), TKGBackend(text, question)
+        # the original only applied the whitelist while masking the target relation
+        allowed = {f"E{i}" for i in range(0, ne, 2)} if rng.random() < 0.5 else None
+        old.allowed_heads = new.allowed_heads = allowed
+        assert old.get_temporal_meta() == new.get_temporal_meta()
+        for i in range(ne):
+            ent = f"E{i}"
+            assert old.relation_search_prune(ent, ent, [], -1, question) == new.relation_search_prune(ent, ent, [], -1, question)
+            for j in range(nr):
+                rel = f"R{j}"
+                for head in (True, False):
+                    masked = old.q is not None and not head and rel == old.q.relation
+                    if allowed is not None and not masked:
+                        continue
+                    assert old.entity_search(ent, rel, head) == new.entity_search(ent, rel, head), (trial, ent, rel, head)
+                assert old.get_target_segments(rel, ent) == new.get_target_segments(rel, ent)
+                for k in range(ne):
+                    assert old.get_triple_segments(f"E{k}", rel, ent) == new.get_triple_segments(f"E{k}", rel, ent)
+
+
+class _NoScan(dict):
+    # a bucket family that only allows keyed lookups
+    def _scan(self, *args):
+        raise AssertionError("full scan of an index family")
+
+    __iter__ = keys = values = items = _scan
+
+
+def test_lookups_do_not_scan_the_graph():
+    rng = random.Random(1)
+    text = random_facts(rng, 500, 30, 3)
+    index = PerContextIndex(text)
+    for name in ("by_rel_tail", "by_hrt", "by_head", "by_tail", "by_head_rel"):
+        setattr(index, name, _NoScan(getattr(index, name)))
+    h, r, t, _ = text.splitlines()[0].split()
+    question = f"Find the entity that was the {r} of {t} immediately after {h} {r} {t}"
+    backend, old = TKGBackend(index, question), baseline.TKGBackend(text, question)
+    assert backend.get_temporal_meta() == old.get_temporal_meta()
+    for ent in ("E0", "E1", t):
+        assert backend.relation_search_prune(ent, ent, [], -1, question) == old.relation_search_prune(ent, ent, [], -1, question)
+        for rel in ("R0", "R1", "R2"):
+            for head in (True, False):
+                assert backend.entity_search(ent, rel, head) == old.entity_search(ent, rel, head)
+            assert backend.get_target_segments(rel, ent) == old.get_target_segments(rel, ent)
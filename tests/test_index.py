@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from submission.qa.index import PerContextIndex
+from submission.tests import baseline
+
+# fragments that exercise the parser's edge cases: odd whitespace, every line separator
+# str.splitlines() knows, several facts per line, non-ASCII digits, glued prefixes
+_PIECES = [
+    "E1", "E22", "R3", "R4", " ", "  ", "\t", "\n", "\r\n", "\r", "\x0c", "\x1c", "\x85", " ",
+    "[1,2]", "[3,4]", "[10,2]", "x", "E5 R3 E7 [4,9]", "E9 R4 E1[2,3] E2 R3 E1 [0,1]", "\n\n",
+    "XE1 R3 E2 [1,1]", "E٣ R3 E1 [1,2]", "E1 R3 E2 [١,2]",
+]
+
+
+def random_text(rng):
+    return "".join(rng.choice(_PIECES) for _ in range(rng.randint(0, 40)))
+
+
+def random_facts(rng, n, num_entities, num_relations, horizon=30):
+    lines = []
+    for _ in range(n):
+        s = rng.randrange(horizon)
+        lines.append(f"E{rng.randrange(num_entities)} R{rng.randrange(num_relations)} E{rng.randrange(num_entities)} [{s},{s + rng.randrange(5)}]")
+    return "\n".join(lines)
+
+
+def _facts(old):
+    # every fact of the baseline index as (head, rel, tail, start, end)
+    return [(h, r, t, s, e) for (r, t), seq in old.by_rel_tail.items() for (h, s, e) in seq]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_matches_baseline_on_noisy_text(lazy):
+    rng = random.Random(5)
+    for _ in range(3000):
+        text = random_text(rng)
+        old, new = baseline.PerContextIndex(text), PerContextIndex(text, lazy=lazy)
+        assert dict(new.by_rel_tail) == dict(old.by_rel_tail), repr(text)
+        assert dict(new.by_hrt) == dict(old.by_hrt), repr(text)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_derived_families(lazy):
+    rng = random.Random(7)
+    for _ in range(200):
+        text = random_facts(rng, rng.randint(0, 150), rng.randint(2, 12), rng.randint(1, 4))
+        old, new = baseline.PerContextIndex(text), PerContextIndex(text, lazy=lazy)
+        facts = _facts(old)
+        by_head, by_tail, by_head_rel = {}, {}, {}
+        for (h, r, t, s, e) in facts:
+            by_head.setdefault(h, []).append((r, t, s, e))
+            by_tail.setdefault(t, []).append((h, r, s, e))
+            by_head_rel.setdefault((h, r), []).append((t, s, e))
+        for want, got in ((by_head, new.by_head), (by_tail, new.by_tail), (by_head_rel, new.by_head_rel)):
+            assert {k: sorted(v) for k, v in want.items()} == {k: sorted(v) for k, v in got.items()}
+        for key, seq in old.by_rel_tail.items():
+            assert new.rel_tail_starts[key] == [s for (_, s, _) in seq]
+            by_end = sorted(seq, key=lambda x: (x[2], x[2] - x[1], x[0]))
+            assert new.rel_tail_by_end[key] == by_end
+            assert new.rel_tail_ends[key] == [e for (_, _, e) in by_end]
+            assert new.rel_tail_max_dur[key] == max(e - s for (_, s, e) in seq)
+            for start in range(-1, 32, 3):
+                assert new.rel_tail_from(key[0], key[1], start) == [x for x in seq if x[1] >= start]
+
+
+def test_lazy_builds_only_the_families_used():
+    index = PerContextIndex("E1 R1 E2 [1,2]\nE3 R1 E2 [2,4]", lazy=True)
+    assert index.rel_tail_starts[("R1", "E2")] == [1, 2]
+    built = {name for name in vars(index) if name.startswith(("by_", "rel_tail"))}
+    assert built == {"by_rel_tail", "rel_tail_starts"}
+    assert index.by_head["E3"] == [("R1", "E2", 2, 4)]
+    assert "by_tail" not in vars(index)
+
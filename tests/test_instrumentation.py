@@ -0,0 +1,71 @@
+import threading
+
+from submission.scripts.run_demo import DummyLLM, answer_record
+from submission.tests.test_run_demo import make_args
+from submission.vendor_adapter.instrumentation import PipelineStats, summarize_stats
+
+
+def test_counters_and_hit_rates():
+    stats = PipelineStats()
+    stats.incr("mcts_nodes", 3)
+    stats.incr("mcts_nodes")
+    for hit in (True, True, False, True):
+        stats.cache("eval_cache", hit)
+    stats.llm_round_trip(0.5)
+    stats.llm_round_trip(0.25, calls=4)
+    with stats.stage("relation_search"):
+        pass
+    stats.add_time("relation_search", 1.0)
+    out = stats.as_dict()
+    assert out["counters"] == {"mcts_nodes": 4, "eval_cache_hits": 3, "eval_cache_misses": 1, "llm_calls": 5}
+    assert out["cache_hit_rate"] == {"eval_cache": 0.75}
+    assert out["llm_latency_s"] == {"count": 2, "total": 0.75, "max": 0.5}
+    assert 1.0 <= out["stage_s"]["relation_search"] < 1.5
+    assert out["rule_answered"] is False
+
+
+def test_counts_from_several_threads():
+    stats = PipelineStats()
+
+    def work():
+        for _ in range(1000):
+            stats.incr("mcts_iterations")
+            stats.cache("prune_cache", True)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stats.counters["mcts_iterations"] == 8000 and stats.counters["prune_cache_hits"] == 8000
+
+
+def test_summary_percentiles():
+    records = []
+    for i in range(1, 11):
+        stats = PipelineStats()
+        stats.add_time("mcts", float(i))
+        stats.incr("llm_calls", i)
+        stats.rule_answered = i <= 3
+        records.append(stats.as_dict())
+    records.append(PipelineStats().as_dict())  # missing entries count as 0
+    summary = summarize_stats(records)
+    assert summary["questions"] == 11 and summary["rule_answered"] == 3
+    assert summary["stage_s"]["mcts"]["max"] == 10.0 and summary["stage_s"]["mcts"]["mean"] == 5.0
+    assert summary["counters"]["llm_calls"]["p50"] == 5
+    assert summarize_stats([]) == {}
+
+
+def test_result_lines_carry_stats_only_when_instrumented():
+    rec = {"question": "Find the entity that was the R1 of E9 immediately after E1 R1 E9",
+           "prompt": "E1 R1 E9 [1,2]\nE2 R1 E9 [2,3]", "label": "E2"}
+    assert "stats" not in answer_record(rec, DummyLLM(), make_args(instrument=False))
+    res = answer_record(rec, DummyLLM(), make_args(instrument=True))
+    assert res["pred"] == "E2" and res["stats"]["rule_answered"] is True
+    assert {"index_build", "rule_prescreen", "total"} <= set(res["stats"]["stage_s"])
+    # unparsed: MCTS from the default topic entity E0
+    rec["question"] = "Which entity comes next?"
+    rec["prompt"] += "\nE0 R1 E9 [0,1]"
+    res = answer_record(rec, DummyLLM(), make_args(instrument=True))
+    assert res["stats"]["rule_answered"] is False
+    assert res["stats"]["counters"]["mcts_iterations"] > 0 and res["stats"]["counters"]["llm_calls"] > 0
@@ -0,0 +1,107 @@
+import multiprocessing
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from submission.vendor_adapter.llm_cache import CachedLLM
+
+
+class EchoLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        return [f"out:{prompt}"]
+
+
+def rows(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_hits_misses_and_persistence(tmp_path):
+    path = tmp_path / "cache.db"
+    llm = EchoLLM()
+    cache = CachedLLM(llm, path)
+    assert cache("a") == ["out:a"] and cache("b") == ["out:b"] and cache("a") == ["out:a"]
+    assert llm.calls == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+    cache.close()
+    reopened = CachedLLM(llm, path)
+    assert reopened("b") == ["out:b"] and llm.calls == 2
+    # a different model id does not see the entries
+    assert CachedLLM(llm, path, model_id="other")("b") == ["out:b"] and llm.calls == 3
+    reopened.close()
+
+
+def test_evicts_least_recently_used_to_low_water(tmp_path):
+    path = tmp_path / "cache.db"
+    llm = EchoLLM()
+    cache = CachedLLM(llm, path, max_entries=10, low_water=0.5)
+    for i in range(10):
+        cache(f"p{i}")
+    cache("p0")  # touch the oldest entry
+    assert rows(path) == 10
+    cache("p10")  # 11 rows: evict down to 5, least recently used first
+    assert rows(path) == 5
+    calls = llm.calls
+    for prompt in ("p0", "p7", "p8", "p9", "p10"):
+        cache(prompt)
+    assert llm.calls == calls
+    # the table stays below max_entries until 5 more new keys arrive
+    for i in range(11, 16):
+        cache(f"p{i}")
+    assert rows(path) == 10
+    cache.close()
+
+
+def test_overwrites_are_not_counted_as_new_rows(tmp_path):
+    path = tmp_path / "cache.db"
+    first, second = CachedLLM(EchoLLM(), path, max_entries=4), CachedLLM(EchoLLM(), path, max_entries=4)
+    for i in range(4):
+        first._put(first._key(f"p{i}"), ["x"])
+        second._put(second._key(f"p{i}"), ["y"])
+    assert second._rows == 0 and rows(path) == 4
+    assert first("p0") == ["y"]
+    first.close()
+    second.close()
+
+
+def test_shared_across_threads(tmp_path):
+    llm = EchoLLM()
+    cache = CachedLLM(llm, tmp_path / "cache.db")
+    prompts = [f"p{i % 20}" for i in range(200)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(cache, prompts))
+    assert outputs == [[f"out:{p}"] for p in prompts]
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 200 and stats["misses"] >= 20
+    cache.close()
+
+
+def _fill(path, start):
+    cache = CachedLLM(EchoLLM(), path)
+    for i in range(start, start + 50):
+        cache(f"p{i}")
+    cache.close()
+
+
+def test_shared_across_processes(tmp_path):
+    path = tmp_path / "cache.db"
+    CachedLLM(EchoLLM(), path).close()
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_fill, args=(path, start)) for start in (0, 25)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    llm = EchoLLM()
+    cache = CachedLLM(llm, path)
+    for i in range(75):
+        assert cache(f"p{i}") == [f"out:p{i}"]
+    assert llm.calls == 0 and rows(path) == 75
+    cache.close()
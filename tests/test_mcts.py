@@ -0,0 +1,197 @@
+import math
+import random
+import re
+import threading
+import time
+
+import pytest
+
+from submission.vendor.rekgmcts.mcts import MCTSPathFinder
+
+
+class GraphBackend:
+    """Backend over a set of (head, relation, tail) edges, walked head -> tail."""
+
+    def __init__(self, edges):
+        self.edges = edges
+
+    def relation_search_prune(self, entity_id, entity_name, pre_relations, pre_head, question, llm=None):
+        rels = sorted({r for (h, r, t) in self.edges if h == entity_id})
+        return [{"entity": entity_id, "relation": r, "score": 1.0, "head": True} for r in rels]
+
+    def entity_search(self, entity, relation, head=True):
+        return sorted({t for (h, r, t) in self.edges if h == entity and r == relation})
+
+    def get_entity_name(self, entity_id):
+        return entity_id
+
+
+class ScoreLLM:
+    """Rates a state by the tail of its last triple (`scores`, default 0.5); counts calls."""
+
+    def __init__(self, scores=None):
+        self.scores = scores or {}
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        triples = re.findall(r"^(?:T: )?\w+, \w+, (\w+)$", prompt, re.M)
+        tail = triples[-1] if triples else None
+        return [f"{self.scores.get(tail, 0.5):.1f}\nrated"]
+
+
+def random_edges(seed, num_entities, num_edges, num_relations=3):
+    rng = random.Random(seed)
+    return {
+        (f"E{rng.randrange(num_entities)}", f"R{rng.randrange(num_relations)}", f"E{rng.randrange(num_entities)}")
+        for _ in range(num_edges)
+    }
+
+
+def finder(edges, llm=None, topics=("E0",), **kwargs):
+    kwargs = {"max_depth": 3, "max_iterations": 30, "score_threshold": 1.0, "num_retain_entity": 3, "seed": 1, **kwargs}
+    return MCTSPathFinder("q", {e: e for e in topics}, llm or ScoreLLM(), backend=GraphBackend(edges), **kwargs)
+
+
+def walk(root):
+    seen, stack = {id(root): root}, [root]
+    while stack:
+        for child in stack.pop().children:
+            if id(child) not in seen:
+                seen[id(child)] = child
+                stack.append(child)
+    return list(seen.values())
+
+
+@pytest.mark.parametrize("budget, reason", [
+    ({"deadline_s": 0}, "deadline"),
+    ({"max_llm_calls": 5}, "llm_calls"),
+    ({"max_llm_tokens": 2000}, "llm_tokens"),
+    ({}, "max_iterations"),
+])
+def test_budget_stop_reasons(budget, reason):
+    f = finder(random_edges(0, 40, 400), **budget)
+    path = f.search()
+    assert f.stop_reason == reason
+    if reason == "deadline":
+        assert path == [] and f.llm_calls == 0
+    if reason == "llm_calls":
+        # checked before each relation's round, so at most one round overshoots
+        assert 5 <= f.llm_calls < 5 + len(f.root.children) + f.num_retain_entity
+    if reason == "llm_tokens":
+        assert f.llm_tokens >= 2000
+
+
+def test_exhausted_and_solved():
+    chain = {("E0", "R0", "E1"), ("E1", "R0", "E2")}
+    f = finder(chain, llm=ScoreLLM({"E2": 0.7}), max_depth=5)
+    assert f.search() == [("E0", "R0", "E1"), ("E1", "R0", "E2")]
+    assert f.stop_reason == "exhausted"
+    f = finder(chain, llm=ScoreLLM({"E2": 0.9}), max_depth=5)
+    assert f.search() == [("E0", "R0", "E1"), ("E1", "R0", "E2")]
+    assert f.stop_reason == "solved"
+
+
+def test_widening_caps_single_relation_fanout():
+    # one relation group per node, like the demo: the cap must apply within the group
+    star = {("E0", "R0", f"E{i}") for i in range(1, 21)}
+    f = finder(star, prune_min_candidates=100, max_iterations=1, widening_k=1)
+    f.search()
+    assert len(f.root.children) == 1
+    f = finder(star, prune_min_candidates=100, max_iterations=10, widening_k=1)
+    f.search()
+    assert 1 < len(f.root.children) <= 10
+    # resumed groups do not add a target twice
+    assert len({child.triple for child in f.root.children}) == len(f.root.children)
+
+
+def test_widening_keeps_searching_past_dead_ends():
+    # with a small cap, selection often lands on terminal best children; it must widen
+    # their parent instead of reporting the tree exhausted
+    edges = random_edges(2, 50, 2000)
+    wide, narrow = finder(edges), finder(edges, widening_k=1)
+    wide.search()
+    narrow.search()
+    assert narrow.stop_reason == "max_iterations"
+    assert len(narrow.root.children) <= math.ceil(narrow.root.visits ** 0.5)
+    assert len(walk(narrow.root)) < len(walk(wide.root))
+
+
+def test_transpositions_merge_orderings_of_the_same_state():
+    # two topic entities stepped in either order reach the same frontier and triples
+    edges = {("E0", "R0", "E1"), ("E5", "R0", "E6"), ("E1", "R0", "E2"), ("E6", "R0", "E7")}
+    for transpositions, merged in ((True, True), (False, False)):
+        f = finder(edges, topics=("E0", "E5"), max_depth=4, transpositions=transpositions)
+        f.search()
+        nodes = walk(f.root)
+        links = sum(len(node.children) for node in nodes)
+        assert (links > len(nodes) - 1) == merged
+
+
+def test_transpositions_terminate_on_back_and_forth_edges():
+    # a path that walks E0 -> E1 -> E0 -> E1 revisits earlier states; linking a node to its
+    # ancestor once made _select loop forever
+    edges = {("E0", "R0", "E1"), ("E1", "R0", "E0"), ("E1", "R1", "E2"), ("E2", "R0", "E1")}
+    f = finder(edges, max_depth=8, max_iterations=200)
+    worker = threading.Thread(target=f.search, daemon=True)
+    worker.start()
+    worker.join(10)
+    assert not worker.is_alive()
+    assert f.stop_reason in ("exhausted", "max_iterations")
+
+
+class BatchScoreLLM(ScoreLLM):
+    def batch(self, prompts):
+        return [self(prompt) for prompt in prompts]
+
+
+@pytest.mark.parametrize("llm_type", [ScoreLLM, BatchScoreLLM])
+def test_concurrent_evaluation_early_exit_matches_sequential(llm_type):
+    # scoring all children at once must still stop at the first >= 0.9 child, leaving the
+    # tree (and transposition table) as if they had been scored one by one
+    star = {("E0", "R0", f"E{i}") for i in range(1, 9)}
+    trees = []
+    for concurrency, llm in ((1, ScoreLLM({"E4": 0.9})), (4, llm_type({"E4": 0.9}))):
+        f = finder(star, llm=llm, prune_min_candidates=100, eval_concurrency=concurrency)
+        returned = f._expand(f.root)
+        trees.append((
+            [child.triple for child in returned],
+            [(child.triple, child.v) for child in f.root.children],
+            len(f._transpositions),
+            f.root.is_fully_expanded,
+        ))
+    assert trees[0] == trees[1]
+    assert trees[0][0] == [("E0", "R0", "E4")] and len(trees[0][1]) == 4
+
+
+class JitterLLM(ScoreLLM):
+    """Sleeps a random few milliseconds per call so worker threads finish in varying order;
+    answers entity-prune prompts with the candidate names as given."""
+
+    def __call__(self, prompt):
+        time.sleep(random.random() * 0.003)
+        if "Candidate Entities: " in prompt:
+            self.calls += 1
+            return [prompt.split("Candidate Entities: ")[1].splitlines()[0]]
+        return super().__call__(prompt)
+
+
+class SharedNameBackend(GraphBackend):
+    # several ids per name: pruning picks among them with the search's RNG
+    def get_entity_name(self, entity_id):
+        return f"N{int(entity_id[1:]) % 7}"
+
+
+def test_parallel_search_is_reproducible_with_a_seed():
+    edges = random_edges(0, 40, 400)
+    scores = {f"N{i}": i / 10 for i in range(7)}
+    runs = []
+    for _ in range(4):
+        f = MCTSPathFinder("q", {"E0": "E0"}, JitterLLM(scores), backend=SharedNameBackend(edges), max_depth=4,
+                           max_iterations=16, score_threshold=1.0, num_retain_entity=3, search_workers=4, seed=3)
+        path = f.search()
+        tree = sorted((node.depth, tuple(node.y), node.visits, node.v, tuple(e["entity_id"] for e in node.entities_info))
+                      for node in walk(f.root))
+        runs.append((path, f.stop_reason, tree))
+    assert all(run == runs[0] for run in runs[1:])
+    assert runs[0][1] == "max_iterations"
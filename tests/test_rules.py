@@ -0,0 +1,139 @@
+import random
+
+import pytest
+
+from submission.qa.corpus_index import CorpusIndex, build_corpus_index
+from submission.qa.index import PerContextIndex
+from submission.qa.parser import (
+    AtTimeQuery,
+    FirstLastQuery,
+    GapQuery,
+    ImmediateAfterQuery,
+    ImmediateBeforeQuery,
+    parse_temporal_question,
+)
+from submission.qa.rules import RuleResult, resolve
+from submission.tests.test_index import random_facts
+
+CONTEXT = "\n".join([
+    "E1 R1 E9 [1,3]",
+    "E2 R1 E9 [3,5]",
+    "E3 R1 E9 [6,8]",
+    "E4 R1 E9 [6,7]",
+    "E5 R1 E9 [0,1]",
+    "E6 R1 E9 [10,12]",
+    "E1 R2 E8 [0,2]",
+    "E2 R2 E8 [0,4]",
+    "E3 R2 E8 [1,4]",
+    "E5 R3 E9 [4,6]",
+])
+
+
+@pytest.fixture(params=["per_context", "corpus"])
+def make_index(request, tmp_path):
+    opened = []
+
+    def make(text):
+        if request.param == "per_context":
+            return PerContextIndex(text)
+        path = tmp_path / f"idx{len(opened)}.bin"
+        build_corpus_index([text], path)
+        opened.append(CorpusIndex(path))
+        return opened[-1]
+    yield make
+    for index in opened:
+        index.close()
+
+
+@pytest.mark.parametrize("question, expected", [
+    # exact start at the pivot end, one head
+    ("Find the entity that was the R1 of E9 immediately after E1 R1 E9", RuleResult(answer="E2")),
+    # two heads start exactly at the pivot end: immediate-after keeps the shortest
+    ("Find the entity that was the R1 of E9 immediately after E5 R3 E9", RuleResult(answer="E4")),
+    ("Find the entity that was the R1 of E9 immediately before E1 R1 E9", RuleResult(answer="E5")),
+    # two heads start exactly 3 after the pivot: tied, shortest first
+    ("Find the entity that was the R1 of E9 3 units after E1 R1 E9", RuleResult(candidates=["E4", "E3"])),
+    # nothing starts at 5: nearest starts after the pivot
+    ("Find the entity that was the R1 of E9 2 units after E1 R1 E9", RuleResult(candidates=["E4", "E3"])),
+    ("Find the entity that was the R1 of E9 2 units before E6 R1 E9", RuleResult(answer="E3")),
+    ("Find the first entity that was the R1 of E9", RuleResult(answer="E5")),
+    ("Find the last entity that was the R1 of E9?", RuleResult(answer="E6")),
+    ("Find the first entity that was the R2 of E8", RuleResult(candidates=["E1", "E2"])),
+    ("Find the last entity that was the R2 of E8", RuleResult(candidates=["E3", "E2"])),
+    ("Find the entity that was the R1 of E9 at time 4", RuleResult(answer="E2")),
+    ("Find the entity that was the R1 of E9 during 7", RuleResult(candidates=["E4", "E3"])),
+    # nothing covers 9: nearest segments on either side
+    ("Find the entity that was the R1 of E9 at time 9", RuleResult(candidates=["E3", "E6"])),
+    # pivot not in the context
+    ("Find the entity that was the R1 of E9 immediately after E7 R1 E9", None),
+])
+def test_resolve(make_index, question, expected):
+    assert resolve(make_index(CONTEXT), parse_temporal_question(question)) == expected
+
+
+def test_parser_templates():
+    parse = parse_temporal_question
+    assert isinstance(parse("Find the entity that was the R1 of E9 immediately after E1 R1 E9"), ImmediateAfterQuery)
+    assert isinstance(parse("Find the entity that was the R1 of E9 immediately before E1 R1 E9"), ImmediateBeforeQuery)
+    assert parse("Find the entity that was the R1 of E9 2 time units before E1 R1 E9") == GapQuery("E1", "R1", "E9", "R1", "E9", 2, "before")
+    assert parse("Find the last entity that was the R1 of E9 ?") == FirstLastQuery("R1", "E9", "last")
+    assert parse("Find the entity that was the R1 of E9 at time 12") == AtTimeQuery("R1", "E9", 12)
+    # qualified variants are not the plain templates; they go to MCTS
+    assert parse("Find the first entity that was the R1 of E9 after E1 R1 E9") is None
+    assert parse("Find the entity that was the R1 of E9 at time 5 before E1 R1 E9") is None
+    assert parse("Find the entity that was the R1 of E9 immediately before E1 R1 E9 at time 3") is None
+
+
+def test_per_context_and_corpus_agree(tmp_path):
+    rng = random.Random(3)
+    templates = [
+        "Find the entity that was the {r} of {t} immediately after {p}",
+        "Find the entity that was the {r} of {t} immediately before {p}",
+        "Find the entity that was the {r} of {t} {g} units after {p}",
+        "Find the entity that was the {r} of {t} {g} units before {p}",
+        "Find the first entity that was the {r} of {t}",
+        "Find the last entity that was the {r} of {t}",
+        "Find the entity that was the {r} of {t} at time {g}",
+    ]
+    for trial in range(60):
+        ne, nr = rng.randint(2, 8), rng.randint(1, 3)
+        text = random_facts(rng, rng.randint(1, 120), ne, nr)
+        path = tmp_path / f"idx{trial}.bin"
+        build_corpus_index([text], path)
+        per_context, corpus = PerContextIndex(text), CorpusIndex(path)
+        lines = text.splitlines()
+        for _ in range(20):
+            pivot = " ".join(rng.choice(lines).split()[:3])
+            question = rng.choice(templates).format(r=f"R{rng.randrange(nr)}", t=f"E{rng.randrange(ne)}", p=pivot, g=rng.randrange(30))
+            query = parse_temporal_question(question)
+            assert query is not None, question
+            assert resolve(per_context, query) == resolve(corpus, query), question
+        corpus.close()
+
+
+def test_at_time_matches_full_scan():
+    rng = random.Random(11)
+    for _ in range(300):
+        facts = []
+        for _ in range(rng.randint(1, 60)):
+            s = rng.randrange(40)
+            # an occasional long segment stretches the covering window over the whole bucket
+            dur = rng.randrange(30) if rng.random() < 0.1 else rng.randrange(4)
+            facts.append((f"E{rng.randrange(8)}", s, s + dur))
+        index = PerContextIndex("\n".join(f"{h} R1 E9 [{s},{e}]" for (h, s, e) in facts))
+        for t in range(-1, 72, 3):
+            covering = sorted((e - s, h) for (h, s, e) in facts if s <= t <= e)
+            if not covering:
+                continue
+            heads = list(dict.fromkeys(h for (_, h) in covering))
+            want = RuleResult(answer=heads[0]) if len(heads) == 1 else RuleResult(candidates=heads)
+            assert resolve(index, AtTimeQuery("R1", "E9", t)) == want
+
+
+def test_corpus_close_with_outstanding_lookups(tmp_path):
+    path = tmp_path / "idx.bin"
+    build_corpus_index([CONTEXT], path)
+    corpus = CorpusIndex(path)
+    starts = corpus.rel_tail_starts[("R1", "E9")]
+    assert list(starts) == [0, 1, 3, 6, 6, 10]
+    corpus.close()
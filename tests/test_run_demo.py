@@ -0,0 +1,52 @@
+import argparse
+import json
+import random
+
+import pytest
+
+from submission.scripts.gen_synthetic import generate_record
+from submission.scripts.run_demo import DummyLLM, add_search_args, answer_record, run_pooled
+
+
+def make_args(**overrides):
+    parser = argparse.ArgumentParser()
+    add_search_args(parser)
+    args = parser.parse_args([])
+    for name, value in {"workers": 3, "pool": "thread", "chunksize": 2, "ordered": True, "seed": 0, **overrides}.items():
+        setattr(args, name, value)
+    return args
+
+
+@pytest.fixture
+def records(tmp_path):
+    rng = random.Random(4)
+    recs = []
+    for i in range(25):
+        rec = generate_record(rng, num_entities=20, num_relations=3, num_facts=60)
+        if i % 3 == 0:
+            # unparsed: goes to MCTS
+            rec["question"] = "Which entity comes next?"
+        # distinct labels make the output order visible
+        rec["label"] = f"L{i}"
+        recs.append(rec)
+    path = tmp_path / "in.jsonl"
+    path.write_text("".join(json.dumps(rec) + "\n" for rec in recs), encoding="utf-8")
+    return recs, path
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_pooled_ordered_matches_inline(records, pool):
+    recs, path = records
+    args = make_args(pool=pool)
+    inline = [answer_record(rec, DummyLLM(), args) for rec in recs]
+    pooled = []
+    assert run_pooled(args, path, pooled.append) is None
+    assert pooled == inline
+
+
+def test_pooled_unordered_emits_every_record(records):
+    recs, path = records
+    args = make_args(ordered=False, workers=4, chunksize=1)
+    pooled = []
+    run_pooled(args, path, pooled.append)
+    assert sorted(res["label"] for res in pooled) == sorted(rec["label"] for rec in recs)
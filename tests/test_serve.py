@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from submission.qa.index import IndexCache
+from submission.scripts.serve import QueryService, _parse_request
+from submission.tests.test_run_demo import make_args
+
+PROMPT = "E0 R1 E9 [0,1]\nE1 R1 E9 [1,2]\nE2 R1 E9 [2,3]"
+
+
+def test_index_cache_reuses_and_evicts():
+    cache = IndexCache(max_entries=2)
+    a, b, c = "E1 R1 E2 [1,2]", "E3 R1 E2 [1,2]", "E4 R1 E2 [1,2]"
+    first = cache.get(a)
+    assert cache.get(a) is first
+    cache.get(b)
+    cache.get(c)  # evicts a, the least recently used
+    assert cache.get(a) is not first
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 2
+
+
+def service(**overrides):
+    return QueryService(make_args(**{"threads": 4, "index_cache_size": 8, **overrides}))
+
+
+def test_answers_and_reuses_the_context_index():
+    svc = service()
+    question = "Find the entity that was the R1 of E9 immediately after E1 R1 E9"
+    res = svc.answer({"id": 7, "prompt": PROMPT, "question": question, "label": "E2"})
+    assert (res["id"], res["pred"], res["correct"]) == (7, "E2", 1)
+    res = svc.answer({"prompt": PROMPT, "question": question.replace("E1 R1", "E0 R1"), "label": "E1"})
+    assert res["pred"] == "E1"
+    stats = svc.close()
+    assert stats["computed"] == 2 and stats["in_flight"] == 0
+    assert stats["index_cache"]["hits"] == 1 and stats["index_cache"]["entries"] == 1
+
+
+def test_concurrent_duplicates_are_merged_with_their_own_labels():
+    # a slow LLM keeps the first (MCTS) computation in flight while the duplicate arrives
+    svc = service(llm_latency=0.05)
+    rec = {"prompt": PROMPT, "question": "Which entity comes next?"}
+    first = svc.submit({**rec, "label": "E1"})
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(svc.answer, [{**rec, "label": label} for label in ("E1", "nobody")]))
+    assert first.result()["pred"] == results[0]["pred"] == results[1]["pred"]
+    assert [res["label"] for res in results] == ["E1", "nobody"]
+    assert results[1]["correct"] == 0
+    stats = svc.close()
+    assert (stats["requests"], stats["computed"], stats["merged"]) == (3, 1, 2)
+
+
+def test_bad_requests():
+    assert _parse_request('{"question": "q"}') == ({"question": "q"}, None)
+    for body in ("not json", "[1, 2]", "3"):
+        rec, error = _parse_request(body)
+        assert rec is None and error.startswith("bad request")
@@ -1,3 +0,0 @@
-current_backend = None
-
-
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+
+
+class PipelineStats:
+    """
+    Per-question timings and counters shared by TKGBackend, MCTSPathFinder and run_demo.
+
+    Components take an optional `stats` argument and skip all bookkeeping when it is None,
+    so the feature costs one attribute check per call site when disabled.
+
+    Recorded:
+      - stage_s[name]: accumulated wall time per stage (index_build, rule_prescreen,
+        relation_search, entity_search, entity_prune, llm_eval, mcts)
+      - counters[name]: llm_calls, mcts_iterations, mcts_nodes, <cache>_hits/<cache>_misses
+      - llm_latency_s: one sample per LLM round trip (a batch counts once)
+      - rule_answered: the exact-match rule answered without MCTS
+    """
+
+    def __init__(self):
+        self.stage_s: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.llm_latency_s: List[float] = []
+        self.rule_answered = False
+        # parallel search / threaded evaluation may record from several threads
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            self.stage_s[name] += seconds
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def cache(self, name: str, hit: bool):
+        with self._lock:
+            self.counters[f"{name}_{'hits' if hit else 'misses'}"] += 1
+
+    def llm_round_trip(self, seconds: float, calls: int = 1):
+        with self._lock:
+            self.counters["llm_calls"] += calls
+            self.llm_latency_s.append(seconds)
+
+    def as_dict(self):
+        out = {
+            "stage_s": dict(self.stage_s),
+            "counters": dict(self.counters),
+            "rule_answered": self.rule_answered,
+        }
+        if self.llm_latency_s:
+            out["llm_latency_s"] = {
+                "count": len(self.llm_latency_s),
+                "total": sum(self.llm_latency_s),
+                "max": max(self.llm_latency_s),
+            }
+        hit_rates = {}
+        for name in {k.rsplit("_", 1)[0] for k in self.counters if k.endswith(("_hits", "_misses"))}:
+            hits = self.counters.get(f"{name}_hits", 0)
+            total = hits + self.counters.get(f"{name}_misses", 0)
+            hit_rates[name] = hits / total if total else 0.0
+        if hit_rates:
+            out["cache_hit_rate"] = hit_rates
+        return out
+
+
+def _percentiles(values: List[float]):
+    values = sorted(values)
+    n = len(values)
+
+    def pick(q):
+        return values[min(n - 1, int(q * n))]
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": values[-1], "mean": sum(values) / n}
+
+
+def summarize_stats(records: Iterable[dict]):
+    """Run-level percentiles over PipelineStats.as_dict() outputs (missing entries count as 0)."""
+    records = list(records)
+    if not records:
+        return {}
+    stages = sorted({k for r in records for k in r["stage_s"]})
+    counters = sorted({k for r in records for k in r["counters"]})
+    return {
+        "questions": len(records),
+        "rule_answered": sum(1 for r in records if r["rule_answered"]),
+        "stage_s": {k: _percentiles([r["stage_s"].get(k, 0.0) for r in records]) for k in stages},
+        "counters": {k: _percentiles([r["counters"].get(k, 0) for r in records]) for k in counters},
+    }
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+class CachedLLM:
+    """
+    Persistent, disk-backed cache around an `llm(prompt) -> [text, ...]` callable.
+
+    Entries are keyed by sha256(model_id, prompt) and stored in SQLite (WAL mode), so
+    several worker processes can share one cache file. Once the table grows past
+    `max_entries`, least-recently-used entries are evicted down to `low_water * max_entries`,
+    so the next eviction is many inserts away (checked against a running row count, and on
+    open/close so short runs are bounded too). If the wrapped LLM offers
+    `batch(prompts)` or `async acall(prompt)`, the same capability is exposed here
+    with cache lookups in front of it.
+    """
+
+    def __init__(self, llm, path, model_id: Optional[str] = None, max_entries: Optional[int] = 100_000, evict_every: int = 256,
+                 low_water: float = 0.9):
+        self.llm = llm
+        self.path = Path(path)
+        self.model_id = model_id or getattr(llm, "model", None) or type(llm).__name__
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self.low_water = min(1.0, max(0.0, low_water))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        # rows in the table as last counted plus our new keys since (other processes' inserts
+        # are picked up by the periodic recount)
+        self._rows = 0
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)")
+        self.evict()
+        if hasattr(llm, "batch"):
+            self.batch = self._batch
+        if hasattr(llm, "acall"):
+            self.acall = self._acall
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str):
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def _put(self, key: str, value: List[str]):
+        conn = self._conn()
+        text, now = json.dumps(value, ensure_ascii=False), time.time()
+        inserted = conn.execute(
+            "INSERT OR IGNORE INTO llm_cache (key, value, last_used) VALUES (?, ?, ?)", (key, text, now)
+        ).rowcount
+        if not inserted:
+            # another thread/process stored this key meanwhile: overwrite, the row count is unchanged
+            conn.execute("UPDATE llm_cache SET value = ?, last_used = ? WHERE key = ?", (text, now, key))
+        with self._lock:
+            self._writes += 1
+            self._rows += inserted
+            check = self._writes % self.evict_every == 0 or (
+                self.max_entries is not None and self._rows > self.max_entries
+            )
+        if check:
+            self.evict()
+
+    def evict(self):
+        """Past max_entries, drop least-recently-used entries down to the low-water mark."""
+        if self.max_entries is None:
+            return
+        conn = self._conn()
+        (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            excess = count - int(self.max_entries * self.low_water)
+            count -= conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            ).rowcount
+        with self._lock:
+            self._rows = count
+
+    def __call__(self, prompt: str):
+        key = self._key(prompt)
+        value = self._get(key)
+        if value is None:
+            value = list(self.llm(prompt))
+            self._put(key, value)
+        return value
+
+    def _batch(self, prompts: List[str]):
+        keys = [self._key(p) for p in prompts]
+        values = [self._get(k) for k in keys]
+        missing = [i for i, v in enumerate(values) if v is None]
+        if missing:
+            outputs = self.llm.batch([prompts[i] for i in missing])
+            for i, out in zip(missing, outputs):
+                values[i] = list(out)
+                self._put(keys[i], values[i])
+        return values
+
+    async def _acall(self, prompt: str):
+        key = self._key(prompt)
+        value = self._get(key)
+        if value is None:
+            value = list(await self.llm.acall(prompt))
+            self._put(key, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    def close(self):
+        self.evict()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,76 +1,90 @@
 from typing import Dict, List, Optional
 
 from submission.qa.index import PerContextIndex
-from submission.qa.parser import parse_immediately_after, ImmediateAfterQuery
+from submission.qa.parser import parse_immediately_after, parse_temporal_question, ImmediateAfterQuery
 
 
 class TKGBackend:
-    def __init__(self, prompt_text: str, question: Optional[str] = None):
-        self.index = PerContextIndex(prompt_text)
+    def __init__(self, prompt_text, question: Optional[str] = None, stats=None):
+        # optional PipelineStats; None disables all timing/counting
+        self.stats = stats
+        # prompt_text is either raw context text or a prebuilt index (e.g. a shared CorpusIndex)
+        if prompt_text is None or isinstance(prompt_text, str):
+            # lazy: by_head/by_tail families are only built if MCTS actually needs them; the
+            # parse here and each later family build are both timed as index_build
+            if stats is None:
+                self.index = PerContextIndex(prompt_text, lazy=True)
+            else:
+                with stats.stage("index_build"):
+                    self.index = PerContextIndex(prompt_text, lazy=True, stats=stats)
+        else:
+            self.index = prompt_text
         self._rel_cache: Dict = {}
         self._ent_cache: Dict = {}
         self._meta_cache = None
         self._segments_cache: Dict = {}
         self.allowed_heads: Optional[set[str]] = None
-        self.q: Optional[ImmediateAfterQuery] = parse_immediately_after(question) if question else None
+        # any parsed temporal query (see qa.parser); all of them carry relation/tail
+        self.q = parse_temporal_question(question) if question else None
 
     def relation_search_prune(self, entity_id: str, entity_name: str, pre_relations: List[str], pre_head: int, question: str, llm=None):
+        if self.stats is None:
+            return self._relation_search_prune(entity_id, entity_name, pre_relations, pre_head, question, llm)
+        with self.stats.stage("relation_search"):
+            return self._relation_search_prune(entity_id, entity_name, pre_relations, pre_head, question, llm)
+
+    def _relation_search_prune(self, entity_id: str, entity_name: str, pre_relations: List[str], pre_head: int, question: str, llm=None):
         ck = (entity_id,)
+        if self.stats is not None:
+            self.stats.cache("rel_cache", ck in self._rel_cache)
         if ck in self._rel_cache:
             return self._rel_cache[ck]
         target_rel = self.q.relation if self.q else None
         rels = set()
-        for (rel, tail), seq in self.index.by_rel_tail.items():
+        for (rel, tail, s, e) in self.index.by_head.get(entity_id, ()):
             if target_rel and rel != target_rel:
                 continue
-            for (head, s, e) in seq:
-                if head == entity_id:
-                    rels.add((rel, True))
-        for (rel, tail), seq in self.index.by_rel_tail.items():
+            rels.add((rel, True))
+        for (head, rel, s, e) in self.index.by_tail.get(entity_id, ()):
             if target_rel and rel != target_rel:
                 continue
-            if tail != entity_id:
-                continue
             rels.add((rel, False))
         result = [{"entity": entity_id, "relation": r, "score": 1.0, "head": h} for (r, h) in sorted(rels)]
         self._rel_cache[ck] = result
         return result
 
     def entity_search(self, entity: str, relation: str, head: bool = True) -> List[str]:
+        if self.stats is None:
+            return self._entity_search(entity, relation, head)
+        with self.stats.stage("entity_search"):
+            return self._entity_search(entity, relation, head)
+
+    def _entity_search(self, entity: str, relation: str, head: bool = True) -> List[str]:
         ck = (entity, relation, bool(head))
+        if self.stats is not None:
+            self.stats.cache("ent_cache", ck in self._ent_cache)
         if ck in self._ent_cache:
             return self._ent_cache[ck]
         result: List[str] = []
         if head:
-            for (rel, tail), seq in self.index.by_rel_tail.items():
-                if rel != relation:
+            for (tail, s, e) in self.index.by_head_rel.get((entity, relation), ()):
+                if self.q and tail != self.q.tail:
                     continue
-                for (h, s, e) in seq:
-                    if h == entity:
-                        if self.q and tail != self.q.tail:
-                            continue
-                        result.append(tail)
+                result.append(tail)
             ret = sorted(set(result))
             self._ent_cache[ck] = ret
             return ret
         else:
             if self.q and relation == self.q.relation:
-                segs = []
-                for (rel, tail), seq in self.index.by_rel_tail.items():
-                    if rel != relation or tail != entity:
-                        continue
-                    for (h, s, e) in seq:
-                        segs.append((h, s, e))
-                if not segs:
+                if not self.index.by_rel_tail.get((relation, entity)):
                     return []
                 meta = self.get_temporal_meta()
                 pivot_end = meta["pivot_end"] if meta else None
                 if pivot_end is not None:
                     head_to_best = {}
                     head_to_exact = {}
-                    for (h, s, e) in segs:
-                        if s < pivot_end:
-                            continue
+                    # segments are start-sorted, so masking start < pivot_end is a bisect
+                    for (h, s, e) in self.index.rel_tail_from(relation, entity, pivot_end):
                         if self.allowed_heads is not None and h not in self.allowed_heads:
                             continue
                         best = head_to_best.get(h)
@@ -92,11 +106,12 @@ class TKGBackend:
                     ret = ordered[:20]
                     self._ent_cache[ck] = ret
                     return ret
-        for (rel, tail), seq in self.index.by_rel_tail.items():
-            if rel != relation or tail != entity:
+        # rule whitelist (other question types) also applies outside the immediate-after masking
+        restrict = self.allowed_heads is not None and self.q is not None and relation == self.q.relation
+        for (h, s, e) in self.index.by_rel_tail.get((relation, entity), ()):
+            if restrict and h not in self.allowed_heads:
                 continue
-            for (h, s, e) in seq:
-                result.append(h)
+            result.append(h)
         ret = sorted(set(result))
         self._ent_cache[ck] = ret
         return ret
@@ -105,21 +120,15 @@ class TKGBackend:
         return entity_id
 
     def get_triple_segments(self, head: str, relation: str, tail: str):
-        segs = []
-        for (rel, t), seq in self.index.by_rel_tail.items():
-            if rel != relation or t != tail:
-                continue
-            for (h, s, e) in seq:
-                if h == head:
-                    segs.append((s, e))
-        return sorted(segs)
+        # by_hrt is already ordered by (start, duration), i.e. by (start, end)
+        return list(self.index.by_hrt.get((head, relation, tail), ()))
 
     def get_temporal_meta(self, question: Optional[str] = None):
         if self._meta_cache is not None and question is None:
             return self._meta_cache
         qstr = question if question is not None else None
         qobj = parse_immediately_after(qstr) if qstr else self.q
-        if not qobj:
+        if not isinstance(qobj, ImmediateAfterQuery):
             return None
         pivots = self.index.by_hrt.get((qobj.pivot_head, qobj.pivot_relation, qobj.pivot_tail), [])
         if not pivots:
@@ -140,13 +149,8 @@ class TKGBackend:
         ck = (relation, tail)
         if ck in self._segments_cache:
             return self._segments_cache[ck]
-        segs = []
-        for (rel, t), seq in self.index.by_rel_tail.items():
-            if rel != relation or t != tail:
-                continue
-            for (h, s, e) in seq:
-                segs.append((h, s, e))
-        ret = sorted(segs, key=lambda x: (x[1], (x[2]-x[1]), x[0]))
+        # by_rel_tail is already ordered by (start, duration, head)
+        ret = list(self.index.by_rel_tail.get((relation, tail), ()))
         self._segments_cache[ck] = ret
         return ret
 